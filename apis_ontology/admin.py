@@ -0,0 +1,45 @@
+from django.contrib import admin, messages
+
+from .bulk_utils import bulk_delete_entities, bulk_merge_entities
+from .models import Instance, Person, Place, Work
+
+
+def format_report(report):
+    relations = ", ".join(
+        f"{count} {name}" for name, count in sorted(report["relations"].items())
+    )
+    return f"{report['entities']} entities, relations: {relations or 'none'}"
+
+
+class EntityAdmin(admin.ModelAdmin):
+    search_fields = ["id"]
+    actions = ["merge_selected"]
+
+    def delete_queryset(self, request, queryset):
+        report = bulk_delete_entities(
+            self.model, queryset.values_list("pk", flat=True), user=request.user
+        )
+        self.message_user(request, f"Deleted {format_report(report)}.")
+
+    @admin.action(description="Merge selected into the one with the lowest id")
+    def merge_selected(self, request, queryset):
+        target = queryset.order_by("pk").first()
+        if target is None or queryset.count() < 2:
+            self.message_user(
+                request, "Select at least two entries to merge.", messages.WARNING
+            )
+            return
+        report = bulk_merge_entities(
+            target, queryset.values_list("pk", flat=True), user=request.user
+        )
+        self.message_user(request, f"Merged {format_report(report)} into {target}.")
+
+
+@admin.register(Person, Work, Instance)
+class NamedEntityAdmin(EntityAdmin):
+    search_fields = ["id", "name"]
+
+
+@admin.register(Place)
+class PlaceAdmin(EntityAdmin):
+    search_fields = ["id", "label"]
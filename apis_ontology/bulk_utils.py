@@ -0,0 +1,204 @@
+import logging
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from apis_core.relations.models import Relation
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import RelationExcerpt, RelationParticipation
+
+logger = logging.getLogger(__name__)
+
+# Sent after relations were deleted or moved with set-based SQL, which
+# bypasses the per-object save and delete signals. Receivers get the
+# relation model as sender and the ids of the affected relations.
+relations_changed = Signal()
+
+_relations_handled = ContextVar("relations_handled", default=False)
+
+
+@contextmanager
+def relations_handled():
+    """
+    Within this block, deleting an entity does not delete its relations
+    one entity at a time, because the caller already took care of them.
+    Outside of it, relations are deleted object by object, so that their
+    signals fire and their history records the requesting user.
+    """
+    token = _relations_handled.set(True)
+    try:
+        yield
+    finally:
+        _relations_handled.reset(token)
+
+
+def relations_are_handled():
+    return _relations_handled.get()
+
+
+def get_touching_relations(entity_ids):
+    """
+    Return all relations that have one of the entities as subject or
+    object, as instances of their concrete relation classes (one query).
+    """
+    return list(
+        Relation.objects.filter(
+            Q(subj_object_id__in=entity_ids) | Q(obj_object_id__in=entity_ids)
+        ).select_subclasses()
+    )
+
+
+def create_deletion_history(model, relations, user):
+    """
+    Write the "-" history records of the relations in one bulk insert,
+    like simple_history would when deleting them one by one, on behalf
+    of `user`.
+    """
+    if not getattr(settings, "SIMPLE_HISTORY_ENABLED", True):
+        return
+    history = model.history.model
+    now = timezone.now()
+    history.objects.bulk_create(
+        [
+            history(
+                history_date=now,
+                history_user=user,
+                history_change_reason="",
+                history_type="-",
+                **{
+                    field.attname: getattr(relation, field.attname)
+                    for field in history.tracked_fields
+                },
+            )
+            for relation in relations
+        ],
+        batch_size=1000,
+    )
+
+
+def delete_relations(relations, user):
+    """
+    Delete the given relations with a few set-based statements per
+    relation class: history records, many to many rows, excerpt links and
+    participations, the rows of the relation class and finally the rows
+    of the Relation base table. This bypasses the per-object delete
+    signals and is only used by `bulk_delete_entities`.
+    Relation classes whose history tracks many to many fields are deleted
+    one by one instead, so that simple_history records those fields too.
+    Return the number of deleted relations per relation class.
+    """
+    by_model = defaultdict(list)
+    for relation in relations:
+        by_model[type(relation)].append(relation)
+
+    report = Counter()
+    with transaction.atomic():
+        for model, model_relations in by_model.items():
+            if getattr(model, "_history_m2m_fields", None):
+                for relation in model_relations:
+                    relation._history_user = user
+                    relation.delete()
+                report[model.__name__] += len(model_relations)
+                continue
+            ids = [relation.pk for relation in model_relations]
+            if hasattr(model, "history"):
+                create_deletion_history(model, model_relations, user)
+            for field in model._meta.local_many_to_many:
+                through = field.remote_field.through
+                through._base_manager.filter(
+                    **{f"{field.m2m_field_name()}__in": ids}
+                )._raw_delete(through._base_manager.db)
+            for link_model in [RelationExcerpt, RelationParticipation]:
+                link_model._base_manager.filter(relation_id__in=ids)._raw_delete(
+                    link_model._base_manager.db
+                )
+            if model is not Relation:
+                model._base_manager.filter(pk__in=ids)._raw_delete(
+                    model._base_manager.db
+                )
+            Relation._base_manager.filter(pk__in=ids)._raw_delete(
+                Relation._base_manager.db
+            )
+            report[model.__name__] += len(ids)
+            transaction.on_commit(
+                lambda model=model, ids=set(ids): relations_changed.send(
+                    sender=model, relation_ids=ids
+                )
+            )
+    return report
+
+
+def bulk_delete_entities(model, entity_ids, user, dry_run=False):
+    """
+    Delete the entities of `model` with the given ids together with every
+    relation touching them, in one transaction, recording `user` in the
+    history. Return a report of what was (or, with `dry_run`, would be)
+    removed.
+    """
+    entities = model.objects.filter(pk__in=entity_ids)
+    entity_ids = set(entities.values_list("pk", flat=True))
+    relations = get_touching_relations(entity_ids)
+    report = {
+        "entities": len(entity_ids),
+        "relations": Counter(type(relation).__name__ for relation in relations),
+    }
+    if dry_run or not entity_ids:
+        return report
+
+    with transaction.atomic(), relations_handled():
+        report["relations"] = delete_relations(relations, user)
+        model.objects.filter(pk__in=entity_ids).delete()
+    logger.info(
+        "Deleted %s %s entities and %s relations",
+        report["entities"],
+        model.__name__,
+        sum(report["relations"].values()),
+    )
+    return report
+
+
+def bulk_merge_entities(target, entity_ids, user, dry_run=False):
+    """
+    Merge the entities with the given ids into `target`, moving all their
+    relations to it with set-based updates, in one transaction, recording
+    `user` in the history of the deleted entities. Return a report of what
+    was (or, with `dry_run`, would be) merged.
+    """
+    entities = list(
+        type(target).objects.filter(pk__in=entity_ids).exclude(pk=target.pk)
+    )
+    relations = get_touching_relations([entity.pk for entity in entities])
+    report = {
+        "entities": len(entities),
+        "relations": Counter(type(relation).__name__ for relation in relations),
+    }
+    if dry_run or not entities:
+        return report
+
+    for entity in entities:
+        # simple_history takes the user from here outside of a request
+        entity._history_user = user
+    with transaction.atomic(), relations_handled():
+        # apis moves the relations in its post_merge_with handler
+        target.merge_with(entities)
+        by_model = defaultdict(set)
+        for relation in relations:
+            by_model[type(relation)].add(relation.pk)
+        for model, ids in by_model.items():
+            transaction.on_commit(
+                lambda model=model, ids=ids: relations_changed.send(
+                    sender=model, relation_ids=ids
+                )
+            )
+    logger.info(
+        "Merged %s entities into %r, moving %s relations",
+        report["entities"],
+        target,
+        sum(report["relations"].values()),
+    )
+    return report
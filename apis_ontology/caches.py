@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+
+logger = logging.getLogger(__name__)
+
+EXCERPTS_CACHE_TIMEOUT = getattr(settings, "EXCERPTS_CACHE_TIMEOUT", 60 * 60)
+
+
+def hash_content(*values):
+    """
+    Return a stable hash of the given field values.
+    """
+    return hashlib.sha256(
+        "\x1f".join("" if value is None else str(value) for value in values).encode()
+    ).hexdigest()
+
+
+def excerpts_generation():
+    """
+    The excerpt payloads embed links to instances, so they belong to the
+    state of the instances: the id of the latest Instance history record,
+    which every create, update and delete adds. It is read from the
+    database, so that all processes agree on it (and on the ETags built
+    from it); the content of the excerpts themselves is checked against
+    their content hash.
+    """
+    from .models import Instance
+
+    return Instance.history.aggregate(latest=Max("history_id"))["latest"] or 0
+
+
+def excerpt_cache_key(xml_id, generation=None):
+    if generation is None:
+        generation = excerpts_generation()
+    return f"excerpts:{generation}:{xml_id}"
+
+
+RENDERED_HTML_TIMEOUT = getattr(settings, "RENDERED_HTML_TIMEOUT", 24 * 60 * 60)
+
+
+def rendered_html_generation():
+    """
+    Rendered comments link to the entities they mention and to Zotero
+    entries, so they belong to the set of existing entities, identified
+    by the number of RootObject rows and their highest id (ids are never
+    reused, so any create or delete changes the pair), and to the version
+    of the Zotero entries. Both are read from the database, so that all
+    processes agree on them.
+    """
+    from apis_core.apis_metainfo.models import RootObject
+
+    state = RootObject.objects.aggregate(count=Count("pk"), latest=Max("pk"))
+    return f"{state['count']}.{state['latest'] or 0}.{zotero_cache.version()}"
+
+
+def rendered_html_key(obj, field, content_hash, generation=None):
+    return (
+        f"html:{generation or rendered_html_generation()}:"
+        f"{obj._meta.label_lower}:{obj.pk}:{field}:{content_hash}"
+    )
+
+
+ZOTERO_CACHE_TIMEOUT = getattr(settings, "ZOTERO_CACHE_TIMEOUT", 60 * 60)
+ZOTERO_VERSION_INTERVAL = getattr(settings, "ZOTERO_VERSION_INTERVAL", 10)
+
+
+class ZoteroCache:
+    """
+    Lookup of zoteroId -> (shortTitle, fullCitation, year) for all
+    ZoteroEntry rows, loaded in one query on first use and kept in the
+    cache backend under the version of the ZoteroEntry table. Each
+    process reads the version from the database at most every
+    ZOTERO_VERSION_INTERVAL seconds, so changes made by any process
+    (including `fetch_zotero_entries`) reach all of them.
+    `stats` reports the lookups served from the cache (hits) and those
+    that had to load the entries from the database (misses).
+    """
+
+    key = "zotero:entries"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._version_read = 0
+
+    def version(self):
+        """
+        Hash of the number of entries and their latest modification time,
+        which changes whenever an entry is added, saved or deleted.
+        """
+        now = time.monotonic()
+        stale = now - self._version_read > ZOTERO_VERSION_INTERVAL
+        if self._version is None or stale:
+            from .models import ZoteroEntry
+
+            state = ZoteroEntry.objects.aggregate(
+                count=Count("pk"), modified=Max("modified")
+            )
+            self._version = hash_content(state["count"], state["modified"])[:16]
+            self._version_read = now
+        return self._version
+
+    def entries(self):
+        key = f"{self.key}:{self.version()}"
+        entries = cache.get(key)
+        if entries is not None:
+            self.hits += 1
+            return entries
+
+        from .models import ZoteroEntry
+
+        self.misses += 1
+        entries = {}
+        for zotero_id, *values in ZoteroEntry.objects.order_by("pk").values_list(
+            "zoteroId", "shortTitle", "fullCitation", "year"
+        ):
+            entries.setdefault(zotero_id, tuple(values))
+        cache.set(key, entries, ZOTERO_CACHE_TIMEOUT)
+        logger.info("Loaded %s Zotero entries into the cache", len(entries))
+        return entries
+
+    def get(self, zotero_id):
+        """Return (shortTitle, fullCitation, year) or None if unknown"""
+        return self.entries().get(zotero_id)
+
+    def get_many(self, zotero_ids):
+        entries = self.entries()
+        return {zotero_id: entries.get(zotero_id) for zotero_id in zotero_ids}
+
+    def invalidate(self):
+        """Read the version again on the next lookup of this process"""
+        self._version = None
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "version": self._version}
+
+
+zotero_cache = ZoteroCache()
@@ -1,69 +1,438 @@
-from apis_core.relations.models import Relation
+import csv
+import json
 import logging
 
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Instance, Person, Place, TibScholRelationMixin, Work
+
 logger = logging.getLogger(__name__)
 
+TOPIC_FIELDS = ["subject_vocab", "subject_of_teaching_vocab"]
+
+FIELDS = [
+    "source_type",
+    "source",
+    "source_label",
+    "target_type",
+    "target",
+    "target_label",
+    "forward",
+    "reverse",
+    "confidence",
+    "start_date_from",
+    "start_date_to",
+    "start_date_sort",
+    "end_date_to",
+    "end_date_from",
+    "end_date_sort",
+    "topics",
+]
+
+DATE_FIELDS = [field for field in FIELDS if "_date_" in field]
+
+
+class Echo:
+    """
+    File-like object that returns what is written to it, so that
+    csv.writer can be used to produce the rows of a streaming response.
+    """
+
+    def write(self, value):
+        return value
+
 
 class TibScholDataExport:
+    """
+    Export engine for relations.
+
+    Relations can be restricted by relation class, confidence, the type
+    of the entities they connect and a date range, and are written as
+    JSON, NDJSON, CSV or Parquet.
+    """
+
+    chunk_size = 1000
+    formats = {
+        "json": "application/json",
+        "ndjson": "application/x-ndjson",
+        "csv": "text/csv",
+        "parquet": "application/vnd.apache.parquet",
+    }
+
+    def __init__(
+        self,
+        relation_classes=None,
+        confidence=None,
+        entity_types=None,
+        date_from=None,
+        date_to=None,
+        chunk_size=None,
+    ):
+        self.relation_classes = self.clean_choices(
+            relation_classes,
+            [model.__name__.lower() for model in self.relation_models()],
+            "relation class",
+        )
+        confidence = self.clean_choices(
+            confidence,
+            [value.lower() for value, _ in TibScholRelationMixin.CONFIDENCE],
+            "confidence",
+        )
+        self.confidence = confidence and [
+            value
+            for value, _ in TibScholRelationMixin.CONFIDENCE
+            if value.lower() in confidence
+        ]
+        self.entity_types = self.clean_choices(
+            entity_types,
+            {
+                model.subj_model.__name__.lower()
+                for model in self.relation_models()
+            }
+            | {model.obj_model.__name__.lower() for model in self.relation_models()},
+            "entity type",
+        )
+        if date_from and date_to and date_from > date_to:
+            raise ValueError("date_from must not be later than date_to")
+        self.date_from = date_from
+        self.date_to = date_to
+        self.chunk_size = chunk_size or self.chunk_size
+
     @staticmethod
-    def all_relations():
-        """
-        Export relations data in JSON format.
-        This method should be implemented to gather the necessary data.
-        """
+    def clean_choices(values, choices, label):
+        if not values:
+            return None
+        values = {value.strip().lower() for value in values if value.strip()}
+        invalid = values - set(choices)
+        if invalid:
+            raise ValueError(f"Unknown {label}: {', '.join(sorted(invalid))}")
+        return values or None
 
-        def get_label(entity):
+    @staticmethod
+    def get_label(entity):
+        try:
+            return entity.name
+        except AttributeError:
             try:
-                return entity.name
+                return entity.label
             except AttributeError:
-                try:
-                    return entity.label
-                except AttributeError:
-                    pass
+                pass
+
+        return str(entity)
 
-            return str(entity)
+    @staticmethod
+    def get_subject_vocab(rel):
+        for field in TOPIC_FIELDS:
+            if hasattr(rel, field):
+                return [sub.name for sub in getattr(rel, field).all()]
+        return []
+
+    @staticmethod
+    def relation_models():
+        return sorted(TibScholRelationMixin.__subclasses__(), key=lambda m: m.__name__)
 
-        def get_subject_vocab(rel):
-            subjects = None
-            if hasattr(rel, "subject_vocab"):
-                subjects = rel.subject_vocab.all()
-            elif hasattr(rel, "subject_of_teaching_vocab"):
-                subjects = rel.subject_of_teaching_vocab.all()
+    def selected_models(self):
+        models = self.relation_models()
+        if self.relation_classes:
+            models = [m for m in models if m.__name__.lower() in self.relation_classes]
+        if self.entity_types:
+            models = [
+                m
+                for m in models
+                if m.subj_model.__name__.lower() in self.entity_types
+                or m.obj_model.__name__.lower() in self.entity_types
+            ]
+        return models
 
-            return [sub.name for sub in subjects] if subjects else []
+    def get_queryset(self, model):
+        queryset = model.objects.all()
+        if self.confidence:
+            queryset = queryset.filter(confidence__in=self.confidence)
+        # a relation is in the date range if its time span overlaps it;
+        # undated relations are left out as soon as a range is requested
+        if self.date_from:
+            queryset = queryset.filter(
+                Q(end_date_to__gte=self.date_from)
+                | Q(end_date_to__isnull=True, start_date_to__gte=self.date_from)
+            )
+        if self.date_to:
+            queryset = queryset.filter(
+                Q(start_date_from__lte=self.date_to)
+                | Q(start_date_from__isnull=True, end_date_from__lte=self.date_to)
+            )
+        return queryset
 
+    @classmethod
+    def relation_data(cls, rel):
+        return {
+            "source_type": rel.subj.__class__.__name__.lower(),
+            "source": rel.subj.id,
+            "source_label": cls.get_label(rel.subj),
+            "target_type": rel.obj.__class__.__name__.lower(),
+            "target": rel.obj.id,
+            "target_label": cls.get_label(rel.obj),
+            "forward": str(rel.name()),
+            "reverse": str(rel.reverse_name()),
+            "confidence": rel.confidence,
+            "start_date_from": rel.start_date_from,
+            "start_date_to": rel.start_date_to,
+            "start_date_sort": rel.start_date_sort,
+            "end_date_from": rel.end_date_from,
+            "end_date_to": rel.end_date_to,
+            "end_date_sort": rel.end_date_sort,
+            "topics": cls.get_subject_vocab(rel),
+        }
+
+    def relation_chunks(self, queryset):
+        """
+        Walk a relation queryset in chunks ordered by primary key (keyset
+        pagination), with the subject, object and topics of every chunk
+        prefetched in bulk.
+        """
+        topic_fields = [f for f in TOPIC_FIELDS if hasattr(queryset.model, f)]
+        queryset = queryset.prefetch_related("subj", "obj", *topic_fields)
+        last_pk = 0
+        while True:
+            chunk = list(
+                queryset.filter(pk__gt=last_pk).order_by("pk")[: self.chunk_size]
+            )
+            if not chunk:
+                return
+            yield chunk
+            last_pk = chunk[-1].pk
+
+    def iter_relations(self):
+        """
+        Yield lists of exported relation dicts, one list per chunk, so
+        that memory use does not depend on the number of relations.
+        """
+        for model in self.selected_models():
+            for chunk in self.relation_chunks(self.get_queryset(model)):
+                data = []
+                for rel in chunk:
+                    try:
+                        data.append(self.relation_data(rel))
+                    except Exception as e:
+                        logger.error(
+                            "Error processing relation %s: %s",
+                            rel.id,
+                            e,
+                            exc_info=True,
+                        )
+                if data:
+                    yield data
+
+    def all_relations(self):
+        """
+        Export relations data as a list of dicts.
+        """
         relation_data = []
-        qs = Relation.objects.select_subclasses()
+        for data in self.iter_relations():
+            relation_data.extend(data)
+        logger.info("Exported %s relations", len(relation_data))
+        return relation_data
 
-        for rel in qs:
-            try:
-                relation_data.append(
-                    {
-                        "source_type": rel.subj.__class__.__name__.lower(),
-                        "source": rel.subj.id,
-                        "source_label": get_label(rel.subj),
-                        "target_type": rel.obj.__class__.__name__.lower(),
-                        "target": rel.obj.id,
-                        "target_label": get_label(rel.obj),
-                        "forward": rel.name(),
-                        "reverse": rel.reverse_name(),
-                        "confidence": rel.confidence,
-                        "start_date_from": rel.start_date_from,
-                        "start_date_to": rel.start_date_to,
-                        "start_date_sort": rel.start_date_sort,
-                        "end_date_to": rel.end_date_from,
-                        "end_date_from": rel.end_date_to,
-                        "end_date_sort": rel.end_date_sort,
-                        "topics": get_subject_vocab(rel),
-                    }
-                )
-            except Exception as e:
-                logger.error(
-                    "Error processing relation %s: %s",
-                    rel.id,
-                    e,
-                    exc_info=True,
+    def stream_json(self):
+        """
+        Export relations as a JSON array, yielded chunk by chunk
+        for use with a StreamingHttpResponse.
+        """
+        yield "["
+        count = 0
+        for data in self.iter_relations():
+            encoded = ",".join(json.dumps(item, cls=DjangoJSONEncoder) for item in data)
+            yield ("," if count else "") + encoded
+            count += len(data)
+        yield "]"
+        logger.info("Exported %s relations", count)
+
+    def stream_ndjson(self):
+        """
+        Export relations as newline delimited JSON, one relation per line.
+        """
+        for data in self.iter_relations():
+            yield "".join(
+                json.dumps(item, cls=DjangoJSONEncoder) + "\n" for item in data
+            )
+
+    def stream_csv(self):
+        """
+        Export relations as CSV rows; topics are joined with "|".
+        """
+        writer = csv.DictWriter(Echo(), fieldnames=FIELDS)
+        yield writer.writeheader()
+        for data in self.iter_relations():
+            yield "".join(
+                writer.writerow({**item, "topics": "|".join(item["topics"])})
+                for item in data
+            )
+
+    def stream(self, format="json"):
+        if format not in self.formats:
+            raise ValueError(f"Unknown export format: {format}")
+        if format == "parquet":
+            raise ValueError("Parquet is a binary format, use write_parquet")
+        return getattr(self, f"stream_{format}")()
+
+    def write_parquet(self, fileobj):
+        """
+        Write relations to a Parquet file, one row group per chunk.
+        """
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {"source": pa.int64(), "target": pa.int64()}
+        types.update({field: pa.date32() for field in DATE_FIELDS})
+        types["topics"] = pa.list_(pa.string())
+        schema = pa.schema([(field, types.get(field, pa.string())) for field in FIELDS])
+        count = 0
+        with pq.ParquetWriter(fileobj, schema) as writer:
+            for data in self.iter_relations():
+                frame = pd.DataFrame(data, columns=FIELDS)
+                writer.write_table(
+                    pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
                 )
+                count += len(data)
+        logger.info("Exported %s relations", count)
+        return count
 
-        print(f"Exported {len(relation_data)} relations")
-        return relation_data
+
+class TibScholDeltaExport(TibScholDataExport):
+    """
+    Export of the entities and relations created, changed or deleted
+    since a point in time, read from the version history tables.
+
+    Every change is a record with `change` set to "upsert" (carrying the
+    current `data`) or "delete" (a tombstone). Relations that still exist
+    but no longer match the filters are exported as tombstones too, so a
+    filtered mirror can drop them. Each export hands out a token to pass
+    as `since` for the next one.
+    """
+
+    formats = {
+        "json": "application/json",
+        "ndjson": "application/x-ndjson",
+    }
+    entity_models = [Person, Place, Work, Instance]
+    token_salt = "apis_ontology.export"
+
+    def __init__(self, since, **kwargs):
+        super().__init__(**kwargs)
+        self.since = self.parse_since(since)
+        # taken before reading anything, so that changes made during the
+        # export are picked up again by the next one
+        self.until = timezone.now()
+        self.token = signing.dumps(self.until.isoformat(), salt=self.token_salt)
+
+    @classmethod
+    def parse_since(cls, since):
+        """
+        Accept a datetime, an ISO 8601 timestamp or an export token.
+        """
+        if not isinstance(since, str):
+            value = since
+        else:
+            try:
+                value = parse_datetime(signing.loads(since, salt=cls.token_salt))
+            except signing.BadSignature:
+                try:
+                    value = parse_datetime(since)
+                except ValueError:
+                    value = None
+        if value is None:
+            raise ValueError(f"Invalid timestamp or export token: {since}")
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def selected_entity_models(self):
+        if self.relation_classes and not self.entity_types:
+            return []
+        return [
+            model
+            for model in self.entity_models
+            if not self.entity_types or model.__name__.lower() in self.entity_types
+        ]
+
+    def changed_ids(self, model):
+        """
+        Map the ids of all objects of `model` with a history record after
+        `since` to the date of their latest change.
+        """
+        return dict(
+            model.history.filter(history_date__gt=self.since)
+            .values("id")
+            .annotate(changed_at=Max("history_date"))
+            .values_list("id", "changed_at")
+        )
+
+    @staticmethod
+    def entity_data(entity):
+        data = {
+            field.attname: field.value_from_object(entity)
+            for field in entity._meta.concrete_fields
+            if not field.primary_key
+        }
+        data["id"] = entity.id
+        data["label"] = TibScholDataExport.get_label(entity)
+        return data
+
+    def change_chunks(self, kind, model, queryset, to_data):
+        changed = self.changed_ids(model)
+        ids = sorted(changed)
+        for start in range(0, len(ids), self.chunk_size):
+            batch = ids[start : start + self.chunk_size]
+            objects = queryset.filter(pk__in=batch).in_bulk()
+            records = []
+            for pk in batch:
+                record = {
+                    "change": "upsert" if pk in objects else "delete",
+                    "kind": kind,
+                    "type": model.__name__.lower(),
+                    "id": pk,
+                    "changed_at": changed[pk],
+                }
+                if pk in objects:
+                    try:
+                        record["data"] = to_data(objects[pk])
+                    except Exception as e:
+                        logger.error(
+                            "Error processing %s %s: %s", kind, pk, e, exc_info=True
+                        )
+                        continue
+                records.append(record)
+            yield records
+
+    def iter_relations(self):
+        """
+        Yield lists of change records, one list per chunk of changed ids.
+        """
+        for model in self.selected_entity_models():
+            yield from self.change_chunks(
+                "entity", model, model.objects.all(), self.entity_data
+            )
+        for model in self.selected_models():
+            topic_fields = [f for f in TOPIC_FIELDS if hasattr(model, f)]
+            queryset = self.get_queryset(model).prefetch_related(
+                "subj", "obj", *topic_fields
+            )
+            yield from self.change_chunks(
+                "relation", model, queryset, self.relation_data
+            )
+
+    def stream_json(self):
+        """
+        Export changes as a JSON object holding `since`, the `token` for
+        the next export and the list of `changes`.
+        """
+        header = json.dumps(
+            {"since": self.since, "token": self.token}, cls=DjangoJSONEncoder
+        )
+        yield header[:-1] + ', "changes": '
+        yield from super().stream_json()
+        yield "}"
@@ -1,13 +1,23 @@
+from functools import partial
+
 from apis_core.apis_entities.filtersets import AbstractEntityFilterSet
 import django_filters
-from apis_core.apis_entities.models import RootObject
 from apis_core.relations.filtersets import RelationFilterSet
 from apis_core.relations.models import Relation
-from django.apps import apps
 from django.db import models
 from django_interval.fields import FuzzyDateParserField
 from django_interval.filters import YearIntervalRangeFilter
 
+from apis_ontology.models import (
+    Instance,
+    NameKey,
+    Person,
+    Place,
+    RelationParticipation,
+    Work,
+)
+from apis_ontology.search import name_search_query, unaccent_icontains
+from apis_ontology.utils import get_relevant_relations, tibetan_name_key
 from apis_ontology.forms import (
     PersonSearchForm,
     PlaceSearchForm,
@@ -28,54 +38,36 @@ ABSTRACT_ENTITY_FILTERS_EXCLUDE = [
 
 
 def filter_related_property(queryset, name, value):
-    rel_class = apps.get_model("apis_ontology", value)
-    referenced_ids = rel_class.objects.values_list("subj", flat=True).union(
-        rel_class.objects.values_list("obj", flat=True)
+    """Keep the entities taking part in a relation of the class `value`"""
+    return queryset.filter(
+        pk__in=RelationParticipation.objects.participants(value)
     )
 
-    queryset = queryset.filter(pk__in=referenced_ids)
-    return queryset
-
 
 def filter_related_entity(queryset, name, value):
-    queryset_pks = queryset.values_list("pk", flat=True)
-    relations = Relation.objects.filter(
-        models.Q(subj__pk__in=queryset_pks) | models.Q(obj__pk__in=queryset_pks)
+    """
+    Keep the entities that are related (as subject or object) to an
+    entity whose name, label or alternative name contains `value`, in
+    either script. Both steps are indexed semi-joins: the name keys find
+    the matching entities and the relation indexes their counterparts.
+    A value without any letters or digits matches nothing.
+    """
+    if not tibetan_name_key(value):
+        return queryset.none()
+    matching_ids = NameKey.objects.matching(value)
+    return queryset.filter(
+        models.Q(
+            pk__in=Relation.objects.filter(obj_object_id__in=matching_ids).values(
+                "subj_object_id"
+            )
+        )
+        | models.Q(
+            pk__in=Relation.objects.filter(subj_object_id__in=matching_ids).values(
+                "obj_object_id"
+            )
+        )
     )
 
-    related_entities_match_pks = []
-    for r in relations:
-        ent_id = r.subj.id
-        rel_ent_id = r.obj.id
-        if r.subj.id not in queryset_pks:
-            ent_id = r.obj.id
-            rel_ent_id = r.subj.id
-
-        if ent_id in related_entities_match_pks:
-            continue
-
-        rel_ent = RootObject.objects_inheritance.get_subclass(pk=rel_ent_id)
-
-        if (
-            hasattr(rel_ent, "alternative_names")
-            and rel_ent.alternative_names
-            and value in rel_ent.alternative_names
-        ):
-            related_entities_match_pks.append(ent_id)
-            continue
-
-        if hasattr(rel_ent, "name") and value in rel_ent.name:
-            related_entities_match_pks.append(ent_id)
-            continue
-
-        if hasattr(rel_ent, "label") and value in rel_ent.label:
-            related_entities_match_pks.append(ent_id)
-            continue
-
-    queryset = queryset.filter(pk__in=related_entities_match_pks)
-
-    return queryset
-
 
 class LegacyStuffMixinFilterSet(AbstractEntityFilterSet):
     class Meta(AbstractEntityFilterSet.Meta):
@@ -169,9 +161,10 @@ class TibScholEntityMixinFilterSet(AbstractEntityFilterSet):
         label="External links contain", lookup_expr="icontains"
     )
 
-    # related_entity = django_filters.CharFilter(
-    #     label="Related entity", method=filter_related_entity
-    # )
+    related_entity = django_filters.CharFilter(
+        label="Related entity", method=filter_related_entity
+    )
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.filters.pop("search", None)  # safely remove the search filter
@@ -190,18 +183,14 @@ class PlaceFilterSet(TibScholEntityMixinFilterSet):
         form = PlaceSearchForm
 
     label = django_filters.CharFilter(method="custom_name_search", label="Name or ID")
-    # related_property = django_filters.ChoiceFilter(
-    #     choices=get_relevant_relations(Place),
-    #     label="Related Property",
-    #     method=filter_related_property,
-    # )
+    related_property = django_filters.ChoiceFilter(
+        choices=partial(get_relevant_relations, Place),
+        label="Related Property",
+        method=filter_related_property,
+    )
 
     def custom_name_search(self, queryset, name, value):
-        name_query = (
-            models.Q(label__unaccent__icontains=value)
-            | models.Q(alternative_names__unaccent__icontains=value)
-            | models.Q(tibetan_transliteration__icontains=value)
-        )
+        name_query = name_search_query("label", value)
         if value.isdigit():
             name_query = name_query | models.Q(pk=int(value))
         return queryset.filter(name_query)
@@ -217,18 +206,14 @@ class PersonFilterSet(TibScholEntityMixinFilterSet):
         form = PersonSearchForm
 
     name = django_filters.CharFilter(method="custom_name_search", label="Name or ID")
-    # related_property = django_filters.ChoiceFilter(
-    #     choices=get_relevant_relations(Person),
-    #     label="Related Property",
-    #     method=filter_related_property,
-    # )
+    related_property = django_filters.ChoiceFilter(
+        choices=partial(get_relevant_relations, Person),
+        label="Related Property",
+        method=filter_related_property,
+    )
 
     def custom_name_search(self, queryset, name, value):
-        name_query = (
-            models.Q(name__unaccent__icontains=value)
-            | models.Q(alternative_names__unaccent__icontains=value)
-            | models.Q(tibetan_transliteration__icontains=value)
-        )
+        name_query = name_search_query("name", value)
         if value.isdigit():
             name_query = name_query | models.Q(pk=int(value))
         return queryset.filter(name_query)
@@ -245,18 +230,14 @@ class WorkFilterSet(TibScholEntityMixinFilterSet):
         form = WorkSearchForm
 
     name = django_filters.CharFilter(method="custom_name_search", label="Name or ID")
-    # related_property = django_filters.ChoiceFilter(
-    #     choices=get_relevant_relations(Work),
-    #     label="Related Property",
-    #     method=filter_related_property,
-    # )
+    related_property = django_filters.ChoiceFilter(
+        choices=partial(get_relevant_relations, Work),
+        label="Related Property",
+        method=filter_related_property,
+    )
 
     def custom_name_search(self, queryset, name, value):
-        name_query = (
-            models.Q(name__unaccent__icontains=value)
-            | models.Q(alternative_names__unaccent__icontains=value)
-            | models.Q(tibetan_transliteration__icontains=value)
-        )
+        name_query = name_search_query("name", value)
         if value.isdigit():
             name_query = name_query | models.Q(pk=int(value))
         return queryset.filter(name_query)
@@ -275,18 +256,15 @@ class InstanceFilterSet(TibScholEntityMixinFilterSet):
     name = django_filters.CharFilter(
         method="custom_name_search", label="Name or Tibschol reference or ID"
     )
-    # related_property = django_filters.ChoiceFilter(
-    #     choices=get_relevant_relations(Instance),
-    #     label="Related Property",
-    #     method=filter_related_property,
-    # )
+    related_property = django_filters.ChoiceFilter(
+        choices=partial(get_relevant_relations, Instance),
+        label="Related Property",
+        method=filter_related_property,
+    )
 
     def custom_name_search(self, queryset, name, value):
-        name_query = (
-            models.Q(name__unaccent__icontains=value)
-            | models.Q(alternative_names__unaccent__icontains=value)
-            | models.Q(tibschol_ref__icontains=value)
-            | models.Q(tibetan_transliteration__icontains=value)
+        name_query = name_search_query("name", value) | models.Q(
+            unaccent_icontains("tibschol_ref", value)
         )
         if value.isdigit():
             name_query = name_query | models.Q(pk=int(value))
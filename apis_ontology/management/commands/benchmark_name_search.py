@@ -0,0 +1,98 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apis_ontology.models import Instance, Person, Place, Work
+from apis_ontology.search import name_search_query, unaccent_icontains
+
+SYLLABLES = [
+    "bla", "ma", "bsod", "nams", "rgyal", "mtshan", "phya", "pa", "chos",
+    "kyi", "seng", "ge", "blo", "ldan", "shes", "rab", "dkon", "mchog",
+]
+
+CREATE_TABLE = """
+CREATE TEMPORARY TABLE name_search_benchmark ON COMMIT DROP AS
+SELECT
+    i AS id,
+    w[1 + floor(random() * %(n)s)::int] || ' ' || w[1 + floor(random() * %(n)s)::int]
+        || 'é ' || w[1 + floor(random() * %(n)s)::int] || ' ' || i AS name
+FROM generate_series(1, %(rows)s) AS i, (SELECT %(syllables)s::text[] AS w) AS s
+"""
+
+MODELS = {"person": Person, "place": Place, "work": Work, "instance": Instance}
+
+
+class Command(BaseCommand):
+    help = "Show the query plans of the entity name search with and without the trigram indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows", type=int, default=100000, help="Rows of the synthetic table"
+        )
+        parser.add_argument("--term", default="seng ge", help="Search term")
+        parser.add_argument(
+            "--model",
+            choices=MODELS,
+            help="Also explain the search on the real table of this entity type",
+        )
+
+    def compiled_condition(self, queryset):
+        """
+        The WHERE clause Django compiles for a name filter on `queryset`,
+        with the column made to refer to the benchmark table instead.
+        """
+        query = queryset.query
+        condition, params = query.get_compiler(connection=connection).compile(
+            query.where
+        )
+        table = connection.ops.quote_name(queryset.model._meta.db_table)
+        return condition.replace(f"{table}.", ""), params
+
+    def explain(self, cursor, label, condition, params):
+        start = time.perf_counter()
+        cursor.execute(
+            f"EXPLAIN ANALYZE SELECT id FROM name_search_benchmark WHERE {condition}",
+            params,
+        )
+        plan = [row[0] for row in cursor.fetchall()]
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{label} ({elapsed * 1000:.1f} ms)"))
+        self.stdout.write("\n".join(plan) + "\n")
+
+    def handle(self, *args, **options):
+        term = options["term"]
+        previous = self.compiled_condition(
+            Person.objects.filter(name__unaccent__icontains=term)
+        )
+        current = self.compiled_condition(
+            Person.objects.filter(unaccent_icontains("name", term))
+        )
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                CREATE_TABLE,
+                {
+                    "rows": options["rows"],
+                    "n": len(SYLLABLES),
+                    "syllables": SYLLABLES,
+                },
+            )
+            cursor.execute("ANALYZE name_search_benchmark")
+
+            self.explain(cursor, "previous, no index", *previous)
+            self.explain(cursor, "current, no index", *current)
+
+            cursor.execute(
+                "CREATE INDEX ON name_search_benchmark "
+                "USING gin (UPPER(tibschol_unaccent(name)) gin_trgm_ops)"
+            )
+            cursor.execute("ANALYZE name_search_benchmark")
+            self.explain(cursor, "previous, trigram index", *previous)
+            self.explain(cursor, "current, trigram index", *current)
+
+        if options["model"]:
+            model = MODELS[options["model"]]
+            name_field = "label" if model is Place else "name"
+            queryset = model.objects.filter(name_search_query(name_field, term))
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{model.__name__} search"))
+            self.stdout.write(queryset.explain(analyze=True))
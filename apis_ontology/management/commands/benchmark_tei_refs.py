@@ -0,0 +1,118 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from apis_ontology.models import Person, Place, Work, Instance, TibScholRelationMixin
+from apis_ontology.templatetags.render_tei_refs import (
+    linkify_excerpt_id,
+    render_tei_refs,
+)
+
+SAMPLE_REFS = [
+    "ex12",
+    "xml:id=\"ex4a\" xml:id=\"ex4b\"",
+    "exX27, ex28 (see also ex301a).",
+    "cf. the colophon, ex5 and exX5b",
+    "not an excerpt: text12 index ex",
+]
+
+
+def legacy_render_tei_refs(value):
+    # what render_tei_refs did before the single-pass tokenizer
+    if not value.strip():
+        return ""
+    lines = value.split("\n")
+    linked_lines = []
+    for line in lines:
+        words = line.strip().split()
+        linked_words = []
+        for w in words:
+            if (
+                w.startswith("xml:id=")
+                or bool(re.search(r"\bex(?:\d\w*)\b", w))
+                or bool(re.search(r"\bexX(?:\w*)\b", w))
+            ):
+                linked_words.append(linkify_excerpt_id(w))
+            else:
+                linked_words.append(w)
+
+        linked_lines.append(" ".join(linked_words))
+
+    return "<br />".join(linked_lines) + "<br />" if len(linked_lines) else ""
+
+
+class Command(BaseCommand):
+    help = "Compare render_tei_refs with the previous implementation and time both"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from-db",
+            action="store_true",
+            help="Use the excerpt references and comments stored in the database",
+        )
+        parser.add_argument(
+            "--lines",
+            type=int,
+            default=200,
+            help="Number of lines of the long reference fields",
+        )
+        parser.add_argument(
+            "--fields", type=int, default=100, help="Number of long fields to render"
+        )
+
+    def get_corpus(self, from_db):
+        if not from_db:
+            return SAMPLE_REFS
+        corpus = []
+        for model in TibScholRelationMixin.__subclasses__():
+            corpus.extend(
+                model.objects.exclude(tei_refs__isnull=True)
+                .exclude(tei_refs="")
+                .values_list("tei_refs", flat=True)
+            )
+        for model in [Person, Place, Work, Instance]:
+            corpus.extend(
+                model.objects.exclude(comments__isnull=True)
+                .exclude(comments="")
+                .values_list("comments", flat=True)
+            )
+        return corpus or SAMPLE_REFS
+
+    def measure(self, label, func, values):
+        start = time.perf_counter()
+        for value in values:
+            func(value)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{label:<12} {elapsed * 1000:10.1f} ms {len(values) / elapsed:12.0f} fields/s"
+        )
+        return elapsed
+
+    def handle(self, *args, **options):
+        corpus = self.get_corpus(options["from_db"])
+
+        mismatches = [
+            value
+            for value in corpus
+            if render_tei_refs(value) != legacy_render_tei_refs(value)
+        ]
+        self.stdout.write(
+            f"Compared {len(corpus)} values, {len(mismatches)} differ from the previous implementation"
+        )
+        for value in mismatches[:10]:
+            self.stdout.write(self.style.ERROR(repr(value)))
+
+        rng = random.Random(0)
+        values = [
+            "\n".join(rng.choice(corpus) for _ in range(options["lines"]))
+            for _ in range(options["fields"])
+        ]
+        self.stdout.write(
+            f"\nRendering {len(values)} fields of {options['lines']} lines "
+            f"({sum(map(len, values)) // len(values)} characters on average)\n"
+        )
+        legacy = self.measure("previous", legacy_render_tei_refs, values)
+        current = self.measure("single-pass", render_tei_refs, values)
+        self.stdout.write(f"Speedup: {legacy / current:.1f}x")
@@ -0,0 +1,107 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from pyewts import pyewts
+
+from apis_ontology.models import Person, Work
+from apis_ontology.transliteration import Transliterator
+
+SAMPLE_NAMES = [
+    "bla ma dam pa bsod nams rgyal mtshan",
+    "phya pa chos kyi seng ge",
+    "rngog blo ldan shes rab",
+    "gtsang nag pa brtson 'grus seng ge",
+    "tshad ma rnam par nges pa'i ti ka",
+    "dbu ma de kho na nyid",
+    "sa skya paN Di ta kun dga' rgyal mtshan",
+    "gsang phu ne'u thog",
+]
+
+
+def legacy_to_tibetan(value):
+    # what apis_ontology.utils.latin_to_tibetan did before the shared engine
+    if not value:
+        return ""
+    return pyewts().toUnicode(value)
+
+
+class Command(BaseCommand):
+    help = "Measure single-call and batch throughput of the EWTS transliteration"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size", type=int, default=2000, help="Number of strings to convert"
+        )
+        parser.add_argument(
+            "--repeat",
+            type=float,
+            default=0.5,
+            help="Share of the strings that repeat an earlier one",
+        )
+        parser.add_argument(
+            "--from-db",
+            action="store_true",
+            help="Sample person and work names instead of built-in examples",
+        )
+
+    def get_values(self, size, repeat, from_db):
+        names = SAMPLE_NAMES
+        if from_db:
+            names = [
+                *Person.objects.exclude(name="").values_list("name", flat=True),
+                *Work.objects.exclude(name="").values_list("name", flat=True),
+            ] or SAMPLE_NAMES
+        rng = random.Random(0)
+        values = []
+        for i in range(size):
+            if values and rng.random() < repeat:
+                values.append(rng.choice(values))
+            else:
+                # make the value unique so that it cannot come from the cache
+                values.append(f"{rng.choice(names)} {i}")
+        return values
+
+    def measure(self, label, func, count):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{label:<28} {elapsed * 1000:10.1f} ms {count / elapsed:12.0f} strings/s"
+        )
+
+    def handle(self, *args, **options):
+        values = self.get_values(options["size"], options["repeat"], options["from_db"])
+        count = len(values)
+        self.stdout.write(
+            f"Converting {count} strings, {len(set(values))} of them distinct\n"
+        )
+
+        self.measure(
+            "legacy (converter per call)",
+            lambda: [legacy_to_tibetan(value) for value in values],
+            count,
+        )
+
+        engine = Transliterator()
+        self.measure(
+            "engine single, cold",
+            lambda: [engine.to_tibetan(value) for value in values],
+            count,
+        )
+        self.measure(
+            "engine single, warm",
+            lambda: [engine.to_tibetan(value) for value in values],
+            count,
+        )
+
+        engine = Transliterator()
+        self.measure("engine batch, cold", lambda: engine.to_tibetan_many(values), count)
+        self.measure("engine batch, warm", lambda: engine.to_tibetan_many(values), count)
+
+        engine = Transliterator(maxsize=0)
+        self.measure(
+            "engine single, no cache",
+            lambda: [engine.to_tibetan(value) for value in values],
+            count,
+        )
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+
+from apis_ontology.models import InstanceWorkAuthor, WorkPrimaryAuthor
+
+
+class Command(BaseCommand):
+    help = "Report drift between the materialized work/instance authors and the live relations"
+
+    fields = {
+        WorkPrimaryAuthor: ["relation_id", "author_id", "author_name"],
+        InstanceWorkAuthor: ["relation_id", "work_id", "author_id", "author_name"],
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Rebuild the projections if any drift is found",
+        )
+
+    def handle(self, *args, **options):
+        drift = 0
+        for model, fields in self.fields.items():
+            expected = {
+                row.pk: tuple(getattr(row, f) for f in fields)
+                for row in model.objects.expected()
+            }
+            stored = {
+                row[0]: tuple(row[1:])
+                for row in model.objects.values_list("pk", *fields)
+            }
+            missing = expected.keys() - stored.keys()
+            extra = stored.keys() - expected.keys()
+            stale = {
+                pk
+                for pk in expected.keys() & stored.keys()
+                if expected[pk] != stored[pk]
+            }
+            for label, pks in (("missing", missing), ("extra", extra), ("stale", stale)):
+                for pk in sorted(pks):
+                    self.stdout.write(
+                        f"{model.__name__} {label}: {pk} "
+                        f"stored={stored.get(pk)} expected={expected.get(pk)}"
+                    )
+            drift += len(missing) + len(extra) + len(stale)
+            self.stdout.write(
+                f"{model.__name__}: {len(expected)} expected, {len(missing)} missing, "
+                f"{len(extra)} extra, {len(stale)} stale"
+            )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Author projections are consistent."))
+            return
+
+        if options["fix"]:
+            WorkPrimaryAuthor.objects.rebuild()
+            InstanceWorkAuthor.objects.rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Fixed {drift} drifted rows."))
+        else:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"{drift} drifted rows. Run with --fix or "
+                    "rebuild_primary_authors."
+                )
+            )
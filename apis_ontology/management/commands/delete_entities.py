@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apis_ontology.bulk_utils import bulk_delete_entities, bulk_merge_entities
+from apis_ontology.models import Instance, Person, Place, Work
+
+MODELS = {model.__name__.lower(): model for model in [Person, Place, Work, Instance]}
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete entities together with all their relations, or merge them "
+        "into another entity, using set-based SQL in one transaction"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", choices=list(MODELS))
+        parser.add_argument("ids", nargs="+", type=int)
+        parser.add_argument(
+            "--merge-into",
+            type=int,
+            help="Merge the entities into this one instead of deleting them",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would be removed",
+        )
+        parser.add_argument(
+            "--user",
+            help="Username recorded in the history of the removed objects",
+        )
+
+    def get_user(self, username):
+        if not username:
+            return None
+        User = get_user_model()
+        try:
+            return User.objects.get(**{User.USERNAME_FIELD: username})
+        except User.DoesNotExist:
+            raise CommandError(f"No user {username}")
+
+    def handle(self, *args, **options):
+        model = MODELS[options["model"]]
+        user = self.get_user(options["user"])
+        if options["merge_into"]:
+            try:
+                target = model.objects.get(pk=options["merge_into"])
+            except model.DoesNotExist:
+                raise CommandError(
+                    f"No {model.__name__} with id {options['merge_into']}"
+                )
+            report = bulk_merge_entities(
+                target, options["ids"], user=user, dry_run=options["dry_run"]
+            )
+            verb = "Would merge" if options["dry_run"] else "Merged"
+        else:
+            report = bulk_delete_entities(
+                model, options["ids"], user=user, dry_run=options["dry_run"]
+            )
+            verb = "Would delete" if options["dry_run"] else "Deleted"
+
+        self.stdout.write(f"{verb} {report['entities']} {model.__name__} entities")
+        for name, count in sorted(report["relations"].items()):
+            self.stdout.write(f"  {count} {name}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{sum(report['relations'].values())} relations in total."
+            )
+        )
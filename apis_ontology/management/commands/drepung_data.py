@@ -1,6 +1,11 @@
 from django.core.management.base import BaseCommand
 
-from apis_ontology.models import Work, Instance, WorkHasAsAnInstanceInstance
+from apis_ontology.models import (
+    Work,
+    Instance,
+    InstanceReference,
+    WorkHasAsAnInstanceInstance,
+)
 import re
 from tqdm.auto import tqdm
 from django.apps import apps
@@ -9,7 +14,6 @@ import django
 from collections import defaultdict
 from django.apps import apps
 
-from django.db.models import Q
 
 import pandas as pd
 
@@ -27,7 +31,9 @@ class Command(BaseCommand):
             if tibschol_ref:
                 try:
                     match = Instance.objects.filter(
-                        Q(tibschol_ref__regex=rf"(^|\b){tibschol_ref}(\b|$)")
+                        pk__in=InstanceReference.objects.lookup([tibschol_ref])[
+                            tibschol_ref
+                        ]
                     )
                     return match
                 except Instance.DoesNotExist:
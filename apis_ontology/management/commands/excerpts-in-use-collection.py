@@ -1,8 +1,8 @@
-from apis_ontology.models import Excerpts, TibScholRelationMixin
+from apis_ontology.models import Excerpts, RelationExcerpt
 
+from django.contrib.contenttypes.models import ContentType
 from django.core.management.base import BaseCommand
-from apis_core.collections.models import SkosCollection
-from tqdm import tqdm
+from apis_core.collections.models import SkosCollection, SkosCollectionContentObject
 
 
 class Command(BaseCommand):
@@ -15,23 +15,25 @@ class Command(BaseCommand):
         excerpt_collection, _ = SkosCollection.objects.get_or_create(
             name="excerpts-in-use"
         )
+        content_type = ContentType.objects.get_for_model(Excerpts)
+        members = excerpt_collection.list(content_type)
 
-        for excerpt in tqdm(Excerpts.objects.all()):
-            # check in xml_id is present in the tei_refs column
-            # of Relation or in any of its subclasses at least once
-            in_use = False
-            for rel_subclass in TibScholRelationMixin.__subclasses__():
-                if rel_subclass.objects.filter(
-                    tei_refs__contains=excerpt.xml_id
-                ).exists():
-                    excerpt_collection.add(excerpt)
-                    in_use = True
-                    break
-            if not in_use:
-                try:
-                    excerpt_collection.remove(excerpt)
-                except Exception as e:
-                    pass
+        # excerpts whose xml_id is linked from the tei_refs column
+        # of Relation or any of its subclasses at least once
+        in_use = RelationExcerpt.objects.in_use()
+        members.exclude(object_id__in=in_use.values("pk")).delete()
+        SkosCollectionContentObject.objects.bulk_create(
+            [
+                SkosCollectionContentObject(
+                    collection=excerpt_collection,
+                    content_type=content_type,
+                    object_id=pk,
+                )
+                for pk in in_use.exclude(
+                    pk__in=members.values("object_id")
+                ).values_list("pk", flat=True)
+            ]
+        )
         self.stdout.write(
             self.style.SUCCESS(
                 "Excerpts used as references have been successfully added to experts-in-use collection."
@@ -0,0 +1,96 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apis_ontology.export_utils import TibScholDataExport, TibScholDeltaExport
+
+
+def date_argument(value):
+    date = parse_date(value)
+    if date is None:
+        raise ValueError(value)
+    return date
+
+
+class Command(BaseCommand):
+    help = (
+        "Export relations as JSON, NDJSON, CSV or Parquet, or with --since "
+        "the entities and relations changed since a timestamp or export token"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=list(TibScholDataExport.formats), default="json"
+        )
+        parser.add_argument(
+            "--output",
+            help="File to write to; defaults to stdout (required for parquet)",
+        )
+        parser.add_argument(
+            "--relation-class",
+            action="append",
+            default=[],
+            help="Relation class to export, e.g. PersonStudentOfPerson (repeatable)",
+        )
+        parser.add_argument(
+            "--confidence", action="append", default=[], help="(repeatable)"
+        )
+        parser.add_argument(
+            "--entity-type",
+            action="append",
+            default=[],
+            help="Only relations involving this entity type (repeatable)",
+        )
+        parser.add_argument("--date-from", type=date_argument, help="YYYY-MM-DD")
+        parser.add_argument("--date-to", type=date_argument, help="YYYY-MM-DD")
+        parser.add_argument(
+            "--chunk-size", type=int, default=TibScholDataExport.chunk_size
+        )
+        parser.add_argument(
+            "--since",
+            help="ISO timestamp or token of a previous export; json and ndjson only",
+        )
+
+    def handle(self, *args, **options):
+        format = options["format"]
+        filters = dict(
+            relation_classes=options["relation_class"],
+            confidence=options["confidence"],
+            entity_types=options["entity_type"],
+            date_from=options["date_from"],
+            date_to=options["date_to"],
+            chunk_size=options["chunk_size"],
+        )
+        try:
+            if options["since"]:
+                if format not in TibScholDeltaExport.formats:
+                    raise ValueError(f"--since does not support {format}")
+                export = TibScholDeltaExport(options["since"], **filters)
+            else:
+                export = TibScholDataExport(**filters)
+        except ValueError as e:
+            raise CommandError(e)
+
+        output = options["output"]
+        if format == "parquet":
+            if not output:
+                raise CommandError("--output is required for parquet exports")
+            with open(output, "wb") as f:
+                count = export.write_parquet(f)
+            self.stderr.write(
+                self.style.SUCCESS(f"Exported {count} relations to {output}.")
+            )
+            return
+
+        f = open(output, "w", newline="") if output else sys.stdout
+        try:
+            for part in export.stream(format):
+                f.write(part)
+        finally:
+            if output:
+                f.close()
+        if output:
+            self.stderr.write(self.style.SUCCESS(f"Exported relations to {output}."))
+        if options["since"]:
+            self.stderr.write(f"Export token: {export.token}")
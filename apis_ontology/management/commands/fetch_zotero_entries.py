@@ -3,6 +3,7 @@ import os
 
 import pandas as pd
 import requests
+from apis_ontology.caches import zotero_cache
 from apis_ontology.models import ZoteroEntry
 from django.core.management.base import BaseCommand
 from tqdm.auto import tqdm
@@ -53,4 +54,6 @@ class Command(BaseCommand):
                 zotero_entry.year = row["data.date"]
                 zotero_entry.save()
 
+        zotero_cache.invalidate()
         print(f"Cached {len(ZoteroEntry.objects.all())} zotero entries.")
+        print(f"Zotero cache version: {zotero_cache.version()}")
@@ -1,10 +1,6 @@
-from collections import defaultdict
+from apis_core.relations.models import Relation
 from django.core.management.base import BaseCommand
-from apis_ontology.models import TibScholRelationMixin
-from tqdm.auto import tqdm
-import re
-from pprint import pprint
-from apis_ontology.models import Excerpts
+from apis_ontology.models import RelationExcerpt
 from datetime import datetime
 
 
@@ -12,41 +8,26 @@ class Command(BaseCommand):
     help = "Get a list of TEI Refs in use in APIS"
 
     def handle(self, *args, **options):
-        def get_tei_id(xml_id):
-            true_id = xml_id.replace('"', "").replace("xml:id=", "").strip().rstrip(".")
-            return true_id
-
-        def get_all_tei_ids(value):
-            lines = value.split("\n")
-            tei_ids = []
-            for l in lines:
-                words = l.split()
-                for w in words:
-                    if w.startswith("xml:id=") or bool(re.search(r"\bex\d\w*", w)):
-                        tei_ids.append(get_tei_id(w))
-            return tei_ids
-
-        models = TibScholRelationMixin.__subclasses__()
-        unique_refs = defaultdict(list)
-        for m in tqdm(models):
-            model_name = str(m).split("'")[1].split(".")[-1]
-            if not hasattr(m, "tei_refs"):
-                break
-            for rel in m.objects.all():
-                if rel.tei_refs:
-                    all_tei_refs = get_all_tei_ids(rel.tei_refs)
-                    for ref in all_tei_refs:
-                        unique_refs[ref].append(
-                            f"{rel.pk}|{model_name}|{rel.subj.pk}|{rel.obj.pk}"
-                        )
+        # links to excerpt ids that have no excerpt
+        missing = list(
+            RelationExcerpt.objects.missing()
+            .order_by("xml_id", "relation_id")
+            .values_list("xml_id", "relation_id")
+        )
+        relations = {
+            rel.pk: rel
+            for rel in Relation.objects.filter(
+                pk__in={relation_id for _, relation_id in missing}
+            ).select_subclasses()
+        }
 
         missing_refs = []
-        for ref in unique_refs.keys():
-            try:
-                Excerpts.objects.get(xml_id=ref)
-            except Excerpts.DoesNotExist as e:
-                for support in unique_refs[ref]:
-                    missing_refs.append(f"|{ref}|{support}|")
+        for ref, relation_id in missing:
+            rel = relations[relation_id]
+            model_name = rel.__class__.__name__
+            missing_refs.append(
+                f"|{ref}|{rel.pk}|{model_name}|{rel.subj_object_id}|{rel.obj_object_id}|"
+            )
 
         with open(f"missing_refs_{datetime.now():%Y%m%d_%H%M%S}.md", "w") as f:
             f.writelines(
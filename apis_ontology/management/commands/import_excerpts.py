@@ -25,10 +25,14 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **kwargs):
+        changed = []
+
         def create_record(row):
             record, _ = Excerpts.objects.get_or_create(xml_id=row.xml_id)
             record.__dict__.update(row.to_dict())
-            record.save()
+            if record.compute_content_hash() != record.content_hash:
+                record.save()
+                changed.append(record.xml_id)
 
         # define an input parameter for import_file
 
@@ -41,5 +45,9 @@ class Command(BaseCommand):
         for _, row in tqdm(df.iterrows(), total=df.shape[0]):
             create_record(row)
 
-        self.stdout.write(self.style.SUCCESS(f"Processed {df.shape[0]} excerpts."))
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {df.shape[0]} excerpts, {len(changed)} new or changed."
+            )
+        )
         print(f"There are {len(Excerpts.objects.all())} in the database now.")
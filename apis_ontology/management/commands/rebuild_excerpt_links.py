@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apis_ontology.models import RelationExcerpt
+
+
+class Command(BaseCommand):
+    help = "Rebuild the links between relations and the excerpts cited in their tei_refs"
+
+    def handle(self, *args, **options):
+        links = RelationExcerpt.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Excerpt links rebuilt with {links} links.")
+        )
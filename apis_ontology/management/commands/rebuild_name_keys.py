@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apis_ontology.models import NameKey
+
+
+class Command(BaseCommand):
+    help = "Rebuild the script-agnostic name keys of all entities"
+
+    def handle(self, *args, **options):
+        keys = NameKey.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Name keys rebuilt with {keys} keys."))
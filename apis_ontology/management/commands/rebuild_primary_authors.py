@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apis_ontology.models import InstanceWorkAuthor, WorkPrimaryAuthor
+
+
+class Command(BaseCommand):
+    help = "Rebuild the materialized primary author of every Work and the work/author lookup of every Instance"
+
+    def handle(self, *args, **options):
+        # instances copy the primary author of their work, so works go first
+        works = WorkPrimaryAuthor.objects.rebuild()
+        instances = InstanceWorkAuthor.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Primary authors rebuilt for {works} works and {instances} instances."
+            )
+        )
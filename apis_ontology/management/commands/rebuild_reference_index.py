@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apis_ontology.models import InstanceReference
+
+
+class Command(BaseCommand):
+    help = "Rebuild the token index of the TibSchol references of all instances"
+
+    def handle(self, *args, **options):
+        tokens = InstanceReference.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Reference index rebuilt with {tokens} tokens.")
+        )
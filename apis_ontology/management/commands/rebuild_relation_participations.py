@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apis_ontology.models import RelationParticipation
+
+
+class Command(BaseCommand):
+    help = "Rebuild the index of which entities take part in which relation classes"
+
+    def handle(self, *args, **options):
+        rows = RelationParticipation.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Relation participations rebuilt with {rows} rows.")
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apis_ontology.models import SearchDocument
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full text search documents of all entities"
+
+    def handle(self, *args, **options):
+        documents = SearchDocument.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Search documents rebuilt for {documents} entities.")
+        )
@@ -1,11 +1,51 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 from django.core.management.base import BaseCommand
-from apis_ontology.models import Person, Place, Instance, Work
+from django.db import transaction
+from apis_ontology.models import (
+    Instance,
+    NameKey,
+    Person,
+    Place,
+    SearchDocument,
+    Work,
+)
+from apis_ontology.transliteration import to_tibetan_many
 from apis_ontology.utils import latin_to_tibetan
 
 class Command(BaseCommand):
     help = 'Transliterates the name or label of Person, Place, Instance, and Work to Tibetan in the tibetan_transliteration field, with logic for language/nationality.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help="Convert in worker processes and write with bulk_update, "
+            "without save signals, history or auditlog entries",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report what would change",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of conversion processes in bulk mode",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of rows per bulk_update in bulk mode",
+        )
+
     def handle(self, *args, **options):
+        if options["bulk"]:
+            return self.handle_bulk(**options)
+
         updated = 0
 
         # Work: only if original_language == 'Tibetan'
@@ -17,27 +57,25 @@ class Command(BaseCommand):
                 tibetan = ''
             if getattr(obj, 'tibetan_transliteration', None) != tibetan:
                 obj.tibetan_transliteration = tibetan
-                obj.save(update_fields=['tibetan_transliteration'])
+                if not options["dry_run"]:
+                    obj.save(update_fields=['tibetan_transliteration'])
                 updated += 1
                 self.stdout.write(f"Updated Work id={obj.pk}")
 
-        # Instance: only if it is an instance of a work whose language is Tibetan
-        from apis_ontology.models import WorkHasAsAnInstanceInstance
-        work_instance_map = {}
-        for rel in WorkHasAsAnInstanceInstance.objects.all():
-            work_instance_map[rel.obj_object_id] = rel.subj_object_id
-
-        for obj in Instance.objects.all():
+        # Instance: only if it is an instance of a work whose language is
+        # Tibetan, following the work stored in InstanceWorkAuthor
+        for obj in Instance.objects.select_related("work_author__work"):
             value = getattr(obj, 'name', None)
-            work_id = work_instance_map.get(obj.id)
-            work = Work.objects.filter(id=work_id).first() if work_id else None
+            work_author = getattr(obj, 'work_author', None)
+            work = work_author.work if work_author else None
             if work and work.original_language == 'Tibetan' and value:
                 tibetan = latin_to_tibetan(value)
             else:
                 tibetan = ''
             if getattr(obj, 'tibetan_transliteration', None) != tibetan:
                 obj.tibetan_transliteration = tibetan
-                obj.save(update_fields=['tibetan_transliteration'])
+                if not options["dry_run"]:
+                    obj.save(update_fields=['tibetan_transliteration'])
                 updated += 1
                 self.stdout.write(f"Updated Instance id={obj.pk}")
 
@@ -50,7 +88,8 @@ class Command(BaseCommand):
                 tibetan = ''
             if getattr(obj, 'tibetan_transliteration', None) != tibetan:
                 obj.tibetan_transliteration = tibetan
-                obj.save(update_fields=['tibetan_transliteration'])
+                if not options["dry_run"]:
+                    obj.save(update_fields=['tibetan_transliteration'])
                 updated += 1
                 self.stdout.write(f"Updated Person id={obj.pk}")
 
@@ -63,8 +102,103 @@ class Command(BaseCommand):
                 tibetan = ''
             if getattr(obj, 'tibetan_transliteration', None) != tibetan:
                 obj.tibetan_transliteration = tibetan
-                obj.save(update_fields=['tibetan_transliteration'])
+                if not options["dry_run"]:
+                    obj.save(update_fields=['tibetan_transliteration'])
                 updated += 1
                 self.stdout.write(f"Updated Place id={obj.pk}")
 
         self.stdout.write(self.style.SUCCESS(f"Transliteration complete. {updated} objects updated."))
+
+    def get_sources(self):
+        """
+        Return, per model, rows of (pk, value to transliterate or None,
+        current transliteration), each model read with a single query.
+        """
+        return {
+            # Work: only if original_language == 'Tibetan'
+            Work: [
+                (pk, name if language == "Tibetan" else None, current)
+                for pk, name, language, current in Work.objects.values_list(
+                    "pk", "name", "original_language", "tibetan_transliteration"
+                )
+            ],
+            # Instance: only if it is an instance of a work whose language is
+            # Tibetan, following the work stored in InstanceWorkAuthor
+            Instance: [
+                (pk, name if language == "Tibetan" else None, current)
+                for pk, name, language, current in Instance.objects.values_list(
+                    "pk",
+                    "name",
+                    "work_author__work__original_language",
+                    "tibetan_transliteration",
+                )
+            ],
+            # Person: only if nationality == 'Tibetan'
+            Person: [
+                (pk, name if nationality == "Tibetan" else None, current)
+                for pk, name, nationality, current in Person.objects.values_list(
+                    "pk", "name", "nationality", "tibetan_transliteration"
+                )
+            ],
+            # Place: always transliterate label
+            Place: list(
+                Place.objects.values_list("pk", "label", "tibetan_transliteration")
+            ),
+        }
+
+    def convert(self, values, workers, chunk_size):
+        values = sorted(set(values))
+        if workers <= 1 or len(values) <= chunk_size:
+            return dict(zip(values, to_tibetan_many(values)))
+        chunks = [
+            values[i : i + chunk_size] for i in range(0, len(values), chunk_size)
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            converted = [t for chunk in pool.map(to_tibetan_many, chunks) for t in chunk]
+        return dict(zip(values, converted))
+
+    def handle_bulk(self, **options):
+        chunk_size = options["chunk_size"]
+        start = time.perf_counter()
+        sources = self.get_sources()
+        converted = self.convert(
+            [value for rows in sources.values() for _, value, _ in rows if value],
+            options["workers"],
+            chunk_size,
+        )
+
+        total_rows = total_updated = 0
+        for model, rows in sources.items():
+            model_start = time.perf_counter()
+            changes = [
+                model(pk=pk, tibetan_transliteration=converted.get(value, ""))
+                for pk, value, current in rows
+                if current != converted.get(value, "")
+            ]
+            if not options["dry_run"]:
+                # bulk_update sends no save signals and writes no history
+                for i in range(0, len(changes), chunk_size):
+                    with transaction.atomic():
+                        model.objects.bulk_update(
+                            changes[i : i + chunk_size], ["tibetan_transliteration"]
+                        )
+                        changed_ids = [obj.pk for obj in changes[i : i + chunk_size]]
+                        SearchDocument.objects.refresh(model, changed_ids)
+                        NameKey.objects.refresh(model, changed_ids)
+            elapsed = time.perf_counter() - model_start
+            self.stdout.write(
+                f"{model.__name__}: {len(rows)} rows, {len(changes)} "
+                f"{'to update' if options['dry_run'] else 'updated'} "
+                f"in {elapsed:.2f}s"
+            )
+            total_rows += len(rows)
+            total_updated += len(changes)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Transliteration complete. {total_updated} of {total_rows} objects "
+                f"{'would be ' if options['dry_run'] else ''}updated in "
+                f"{elapsed:.2f}s ({total_rows / elapsed if elapsed else 0:.0f} rows/s)."
+            )
+        )
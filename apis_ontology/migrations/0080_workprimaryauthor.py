@@ -0,0 +1,85 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, Value, When
+
+
+def populate_primary_authors(apps, schema_editor):
+    Work = apps.get_model("apis_ontology", "Work")
+    Person = apps.get_model("apis_ontology", "Person")
+    PersonAuthorOfWork = apps.get_model("apis_ontology", "PersonAuthorOfWork")
+    WorkPrimaryAuthor = apps.get_model("apis_ontology", "WorkPrimaryAuthor")
+
+    candidates = (
+        PersonAuthorOfWork.objects.filter(obj_object_id__in=Work.objects.values("pk"))
+        .annotate(
+            confidence_order=Case(
+                When(confidence="Positive", then=Value(0)),
+                When(confidence="Uncertain", then=Value(1)),
+                When(confidence="Negative", then=Value(2)),
+                default=Value(3),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("obj_object_id", "confidence_order", "pk")
+        .values_list("pk", "obj_object_id", "subj_object_id", "confidence_order")
+    )
+    primary = {}
+    for relation_id, work_id, author_id, rank in candidates:
+        primary.setdefault(work_id, (relation_id, author_id, rank))
+
+    names = dict(Person.objects.values_list("pk", "name"))
+    WorkPrimaryAuthor.objects.bulk_create(
+        [
+            WorkPrimaryAuthor(
+                work_id=work_id,
+                relation_id=relation_id,
+                author_id=author_id,
+                author_name=names.get(author_id),
+                confidence_rank=rank,
+            )
+            for work_id, (relation_id, author_id, rank) in primary.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apis_ontology", "0079_personannotatorofinstance_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WorkPrimaryAuthor",
+            fields=[
+                (
+                    "work",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="primary_author",
+                        serialize=False,
+                        to="apis_ontology.work",
+                    ),
+                ),
+                ("relation_id", models.PositiveIntegerField(db_index=True, null=True)),
+                (
+                    "author_name",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("confidence_rank", models.PositiveSmallIntegerField(default=3)),
+                (
+                    "author",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="apis_ontology.person",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(populate_primary_authors, migrations.RunPython.noop),
+    ]
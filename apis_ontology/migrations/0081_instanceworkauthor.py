@@ -0,0 +1,105 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, IntegerField, Value, When
+
+
+def populate_instance_work_authors(apps, schema_editor):
+    Instance = apps.get_model("apis_ontology", "Instance")
+    WorkHasAsAnInstanceInstance = apps.get_model(
+        "apis_ontology", "WorkHasAsAnInstanceInstance"
+    )
+    WorkPrimaryAuthor = apps.get_model("apis_ontology", "WorkPrimaryAuthor")
+    InstanceWorkAuthor = apps.get_model("apis_ontology", "InstanceWorkAuthor")
+
+    candidates = (
+        WorkHasAsAnInstanceInstance.objects.filter(
+            obj_object_id__in=Instance.objects.values("pk")
+        )
+        .annotate(
+            confidence_order=Case(
+                When(confidence="Positive", then=Value(0)),
+                When(confidence="Uncertain", then=Value(1)),
+                When(confidence="Negative", then=Value(2)),
+                default=Value(3),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("obj_object_id", "confidence_order", "pk")
+        .values_list("pk", "obj_object_id", "subj_object_id")
+    )
+    primary = {}
+    for relation_id, instance_id, work_id in candidates:
+        primary.setdefault(instance_id, (relation_id, work_id))
+
+    authors = {
+        work_id: (author_id, author_name)
+        for work_id, author_id, author_name in WorkPrimaryAuthor.objects.values_list(
+            "work_id", "author_id", "author_name"
+        )
+    }
+    InstanceWorkAuthor.objects.bulk_create(
+        [
+            InstanceWorkAuthor(
+                instance_id=instance_id,
+                relation_id=relation_id,
+                work_id=work_id,
+                author_id=authors.get(work_id, (None, None))[0],
+                author_name=authors.get(work_id, (None, None))[1],
+            )
+            for instance_id, (relation_id, work_id) in primary.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apis_ontology", "0080_workprimaryauthor"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InstanceWorkAuthor",
+            fields=[
+                (
+                    "instance",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="work_author",
+                        serialize=False,
+                        to="apis_ontology.instance",
+                    ),
+                ),
+                ("relation_id", models.PositiveIntegerField(db_index=True, null=True)),
+                (
+                    "author_name",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="apis_ontology.person",
+                    ),
+                ),
+                (
+                    "work",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="apis_ontology.work",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(
+            populate_instance_work_authors, migrations.RunPython.noop
+        ),
+    ]
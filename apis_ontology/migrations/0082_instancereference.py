@@ -0,0 +1,61 @@
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_instance_references(apps, schema_editor):
+    Instance = apps.get_model("apis_ontology", "Instance")
+    InstanceReference = apps.get_model("apis_ontology", "InstanceReference")
+
+    InstanceReference.objects.bulk_create(
+        [
+            InstanceReference(instance_id=pk, token=token)
+            for pk, tibschol_ref in Instance.objects.exclude(
+                tibschol_ref__isnull=True
+            ).values_list("pk", "tibschol_ref")
+            for token in set(re.findall(r"\w+", tibschol_ref.lower()))
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apis_ontology", "0081_instanceworkauthor"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InstanceReference",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("token", models.CharField(db_index=True, max_length=255)),
+                (
+                    "instance",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reference_tokens",
+                        to="apis_ontology.instance",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("token", "instance"), name="unique_instance_reference"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_instance_references, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+import hashlib
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def populate_content_hashes(apps, schema_editor):
+    Excerpts = apps.get_model("apis_ontology", "Excerpts")
+
+    now = timezone.now()
+    excerpts = list(Excerpts.objects.all())
+    for excerpt in excerpts:
+        values = [
+            excerpt.xml_content,
+            excerpt.source,
+            excerpt.tibschol_refs,
+            excerpt.zotero_refs,
+            excerpt.status,
+            excerpt.location,
+        ]
+        excerpt.content_hash = hashlib.sha256(
+            "\x1f".join("" if v is None else str(v) for v in values).encode()
+        ).hexdigest()
+        excerpt.modified = now
+    Excerpts.objects.bulk_update(
+        excerpts, ["content_hash", "modified"], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apis_ontology", "0082_instancereference"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="excerpts",
+            name="content_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="excerpts",
+            name="modified",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_content_hashes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,77 @@
+import re
+import string
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+TEI_REF_EXCERPT = re.compile(r"(?<!\S)(?:xml:id=|\S*?\bex[\dX])\S*")
+
+
+def populate_relation_excerpts(apps, schema_editor):
+    Relation = apps.get_model("relations", "Relation")
+    RelationExcerpt = apps.get_model("apis_ontology", "RelationExcerpt")
+
+    rows = []
+    for model in apps.get_app_config("apis_ontology").get_models():
+        if not issubclass(model, Relation):
+            continue
+        for pk, tei_refs in model.objects.exclude(tei_refs__isnull=True).values_list(
+            "pk", "tei_refs"
+        ):
+            xml_ids = []
+            for word in TEI_REF_EXCERPT.findall(tei_refs):
+                xml_id = (
+                    word.replace('"', "")
+                    .replace("xml:id=", "")
+                    .strip()
+                    .rstrip(".")
+                    .strip(string.punctuation)
+                )
+                if xml_id and xml_id not in xml_ids:
+                    xml_ids.append(xml_id)
+            rows.extend(
+                RelationExcerpt(relation_id=pk, xml_id=xml_id) for xml_id in xml_ids
+            )
+    RelationExcerpt.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("relations", "0001_initial"),
+        ("apis_ontology", "0083_excerpts_content_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelationExcerpt",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("xml_id", models.CharField(db_index=True, max_length=255)),
+                (
+                    "relation",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="excerpt_links",
+                        to="relations.relation",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("relation", "xml_id"), name="unique_relation_excerpt"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_relation_excerpts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.contrib.postgres.operations import TrigramExtension, UnaccentExtension
+from django.db import migrations
+
+# unaccent() is only STABLE, because its dictionary could change; this
+# wrapper pins the dictionary so that it can be used in index expressions
+CREATE_UNACCENT_FUNCTION = """
+CREATE OR REPLACE FUNCTION tibschol_unaccent(text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+"""
+
+DROP_UNACCENT_FUNCTION = "DROP FUNCTION IF EXISTS tibschol_unaccent(text);"
+
+# table -> name column, see apis_ontology.search.search_expression
+NAME_COLUMNS = {
+    "apis_ontology_person": "name",
+    "apis_ontology_place": "label",
+    "apis_ontology_work": "name",
+    "apis_ontology_instance": "name",
+}
+
+
+def index_operations():
+    for table, column in NAME_COLUMNS.items():
+        index = f"{table}_{column}_trgm"
+        yield migrations.RunSQL(
+            f"CREATE INDEX IF NOT EXISTS {index} ON {table} "
+            f"USING gin (UPPER(tibschol_unaccent({column})) gin_trgm_ops);",
+            f"DROP INDEX IF EXISTS {index};",
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apis_ontology", "0084_relationexcerpt"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        UnaccentExtension(),
+        migrations.RunSQL(CREATE_UNACCENT_FUNCTION, DROP_UNACCENT_FUNCTION),
+        *index_operations(),
+    ]
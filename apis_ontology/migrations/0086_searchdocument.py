@@ -0,0 +1,102 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+
+def alternative_labels(value):
+    if not value:
+        return []
+    if isinstance(value, dict):
+        return [str(label) for label in value.values() if label]
+    if isinstance(value, list):
+        return [
+            str(item.get("label", "")) if isinstance(item, dict) else str(item)
+            for item in value
+            if item
+        ]
+    return [label.strip() for label in str(value).split("\n") if label.strip()]
+
+
+def populate_search_documents(apps, schema_editor):
+    SearchDocument = apps.get_model("apis_ontology", "SearchDocument")
+
+    for model_name, name_field in [
+        ("Instance", "name"),
+        ("Person", "name"),
+        ("Place", "label"),
+        ("Work", "name"),
+    ]:
+        model = apps.get_model("apis_ontology", model_name)
+        SearchDocument.objects.bulk_create(
+            [
+                SearchDocument(
+                    entity_id=pk,
+                    entity_type=model_name,
+                    label=label or "",
+                    alternative_labels="\n".join(alternative_labels(alternatives)),
+                    transliteration=transliteration or "",
+                    search_text=comments or "",
+                )
+                for pk, label, alternatives, transliteration, comments in (
+                    model.objects.values_list(
+                        "pk",
+                        name_field,
+                        "alternative_names",
+                        "tibetan_transliteration",
+                        "comments",
+                    )
+                )
+            ],
+            batch_size=1000,
+        )
+    SearchDocument.objects.update(
+        document=SearchVector("label", weight="A", config="simple")
+        + SearchVector("alternative_labels", weight="B", config="simple")
+        + SearchVector("transliteration", weight="C", config="simple")
+        + SearchVector("search_text", weight="D", config="simple")
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apis_metainfo", "0012_remove_rootobject_deprecated_name"),
+        ("apis_ontology", "0085_name_search_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "entity",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="apis_metainfo.rootobject",
+                    ),
+                ),
+                ("entity_type", models.CharField(db_index=True, max_length=255)),
+                ("label", models.TextField(blank=True, default="")),
+                ("alternative_labels", models.TextField(blank=True, default="")),
+                ("transliteration", models.TextField(blank=True, default="")),
+                ("search_text", models.TextField(blank=True, default="")),
+                (
+                    "document",
+                    django.contrib.postgres.search.SearchVectorField(null=True),
+                ),
+            ],
+            options={
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["document"], name="search_document_gin"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
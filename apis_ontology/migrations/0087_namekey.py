@@ -0,0 +1,108 @@
+import re
+import unicodedata
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+from pyewts import pyewts
+
+
+def alternative_labels(value):
+    if not value:
+        return []
+    if isinstance(value, dict):
+        return [str(label) for label in value.values() if label]
+    if isinstance(value, list):
+        return [
+            str(item.get("label", "")) if isinstance(item, dict) else str(item)
+            for item in value
+            if item
+        ]
+    return [label.strip() for label in str(value).split("\n") if label.strip()]
+
+
+def name_key(converter, value):
+    # apis_ontology.utils.tibetan_name_key at the time of this migration
+    if not value:
+        return ""
+    value = re.sub(
+        r"[\u0f00-\u0fff]+", lambda m: f" {converter.toWylie(m.group())} ", value
+    )
+    value = unicodedata.normalize(
+        "NFKD", re.sub(r"['\u2018\u2019\u02bc`]", "", value.lower())
+    )
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return " ".join(re.findall(r"[^\W_]+", value))
+
+
+def populate_name_keys(apps, schema_editor):
+    NameKey = apps.get_model("apis_ontology", "NameKey")
+    converter = pyewts()
+
+    for model_name, name_field in [
+        ("Instance", "name"),
+        ("Person", "name"),
+        ("Place", "label"),
+        ("Work", "name"),
+    ]:
+        model = apps.get_model("apis_ontology", model_name)
+        NameKey.objects.bulk_create(
+            [
+                NameKey(entity_id=pk, key=key)
+                for pk, name, alternatives, transliteration in model.objects.values_list(
+                    "pk", name_field, "alternative_names", "tibetan_transliteration"
+                )
+                for key in {
+                    name_key(converter, value)
+                    for value in [
+                        name,
+                        transliteration,
+                        *alternative_labels(alternatives),
+                    ]
+                }
+                if key
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apis_metainfo", "0012_remove_rootobject_deprecated_name"),
+        ("apis_ontology", "0086_searchdocument"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NameKey",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.TextField()),
+                (
+                    "entity",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="name_keys",
+                        to="apis_metainfo.rootobject",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["key"], name="name_key_trgm", opclasses=["gin_trgm_ops"]
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_name_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_relation_participations(apps, schema_editor):
+    Relation = apps.get_model("relations", "Relation")
+    RelationParticipation = apps.get_model("apis_ontology", "RelationParticipation")
+
+    rows = []
+    for model in apps.get_app_config("apis_ontology").get_models():
+        if not issubclass(model, Relation):
+            continue
+        for pk, subj_object_id, obj_object_id in model.objects.values_list(
+            "pk", "subj_object_id", "obj_object_id"
+        ):
+            for role, entity_id in [("subj", subj_object_id), ("obj", obj_object_id)]:
+                if entity_id is not None:
+                    rows.append(
+                        RelationParticipation(
+                            relation_id=pk,
+                            relation_class=model.__name__,
+                            role=role,
+                            entity_id=entity_id,
+                        )
+                    )
+    RelationParticipation.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("relations", "0001_initial"),
+        ("apis_ontology", "0087_namekey"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelationParticipation",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("relation_class", models.CharField(max_length=255)),
+                (
+                    "role",
+                    models.CharField(
+                        choices=[("subj", "Subject"), ("obj", "Object")], max_length=4
+                    ),
+                ),
+                ("entity_id", models.PositiveIntegerField(db_index=True)),
+                (
+                    "relation",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="participations",
+                        to="relations.relation",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["relation_class", "entity_id"],
+                        name="relation_participation_class",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(
+            populate_relation_participations, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apis_ontology", "0088_relationparticipation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="zoteroentry",
+            name="modified",
+            field=models.DateTimeField(auto_now=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+# see apis_ontology.search.search_expression
+INDEX = "apis_ontology_instance_tibschol_ref_trgm"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apis_ontology", "0090_zoteroentry_modified"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f"CREATE INDEX IF NOT EXISTS {INDEX} ON apis_ontology_instance "
+            f"USING gin (UPPER(tibschol_unaccent(tibschol_ref)) gin_trgm_ops);",
+            f"DROP INDEX IF EXISTS {INDEX};",
+        ),
+    ]
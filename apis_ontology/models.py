@@ -1,15 +1,26 @@
 
 import logging
+import re
+import string
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from apis_core.apis_entities.abc import E53_Place
 from apis_core.apis_entities.models import AbstractEntity
+from apis_core.apis_metainfo.models import RootObject
 from apis_core.generic.abc import GenericModel
 from apis_core.history.models import VersionMixin
 from apis_core.relations.models import Relation
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+)
 from django.db.models import (
     Case,
+    F,
     IntegerField,
     OuterRef,
     QuerySet,
@@ -19,10 +30,13 @@ from django.db.models import (
 )
 from django.db.models.signals import class_prepared
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_interval.fields import FuzzyDateParserField
+from .caches import hash_content
 from .date_utils import tibschol_dateparser
 from .fields import AlternativeLabelsField
+from .utils import tibetan_name_key
 from auditlog.registry import auditlog
 
 logger = logging.getLogger(__name__)
@@ -63,6 +77,48 @@ class TibScholEntityMixin(models.Model):
         blank=True, null=True, verbose_name=_("External links")
     )
 
+    # fields whose values at load time are remembered, so that signals can
+    # tell what changed without reloading the object from the database
+    tracked_fields = [
+        "tibetan_transliteration",
+        "name",
+        "label",
+        "original_language",
+        "nationality",
+    ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value
+            for name, value in zip(field_names, values)
+            if name in cls.tracked_fields
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.snapshot_tracked_fields()
+
+    def snapshot_tracked_fields(self):
+        """Remember the current values of the tracked fields as loaded ones"""
+        self._loaded_values = {
+            name: getattr(self, name)
+            for name in self.tracked_fields
+            if name in self.__dict__
+        }
+
+    def tracked_field_changed(self, name):
+        """
+        Whether a tracked field differs from its loaded value, or None if
+        the loaded value is not known (e.g. the field was deferred).
+        """
+        loaded = getattr(self, "_loaded_values", {})
+        if name not in loaded:
+            return None
+        return loaded[name] != getattr(self, name)
+
 
 class LegacyStuffMixin(models.Model):
     class Meta:
@@ -181,34 +237,38 @@ def get_confidence_order():
     )
 
 
-def get_author_id_subquery(work_ref):
-    return Subquery(
-        PersonAuthorOfWork.objects.filter(obj_object_id=work_ref)
+def get_primary_subjects(relations, obj_model):
+    """
+    Pick the best ranked relation (by confidence, then relation id) for
+    every object in the `relations` queryset and return a dict mapping
+    obj_object_id -> (relation id, subj_object_id, confidence rank).
+    Relations pointing to objects that do not exist are skipped.
+    """
+    candidates = (
+        relations.filter(obj_object_id__in=obj_model._base_manager.values("pk"))
         .annotate(confidence_order=get_confidence_order())
-        .order_by("confidence_order")
-        .values("subj_object_id")[:1]
+        .order_by("obj_object_id", "confidence_order", "pk")
+        .values_list("pk", "obj_object_id", "subj_object_id", "confidence_order")
     )
-
-
-def get_author_name_subquery(author_ref):
-    return Subquery(Person.objects.filter(id=author_ref).values("name")[:1])
+    primary = {}
+    for relation_id, obj_id, subj_id, rank in candidates:
+        primary.setdefault(obj_id, (relation_id, subj_id, rank))
+    return primary
 
 
 class WorkQuerySet(QuerySet):
     def with_author(self):
+        # the primary author is read from the materialized WorkPrimaryAuthor
+        # table, which is a single LEFT JOIN instead of correlated subqueries
         return self.annotate(
-            author_id=get_author_id_subquery(OuterRef("id")),
-            author_name=get_author_name_subquery(OuterRef("author_id")),
+            author_id=F("primary_author__author_id"),
+            author_name=F("primary_author__author_name"),
         )
 
 
 class WorkManager(TibScholEntityManager):
     def get_queryset(self):
-        return (
-            WorkQuerySet(self.model, using=self._db)
-            .filter(id__in=super().get_queryset().values_list("id", flat=True))
-            .with_author()
-        )
+        return WorkQuerySet(self.model, using=self._db).with_author()
 
 
 class Work(VersionMixin, LegacyStuffMixin, TibScholEntityMixin, AbstractEntity):
@@ -259,27 +319,98 @@ class Work(VersionMixin, LegacyStuffMixin, TibScholEntityMixin, AbstractEntity):
     objects = WorkManager()
 
 
+class WorkPrimaryAuthorManager(models.Manager):
+    def _compute(self, relations):
+        """
+        Pick the best ranked author (by confidence, then relation id) for
+        every work touched by the `relations` queryset and return unsaved
+        WorkPrimaryAuthor rows.
+        """
+        primary = get_primary_subjects(relations, Work)
+        author_ids = {author_id for _, author_id, _ in primary.values()}
+        names = dict(
+            Person._base_manager.filter(pk__in=author_ids).values_list("pk", "name")
+        )
+        return [
+            self.model(
+                work_id=work_id,
+                relation_id=relation_id,
+                author_id=author_id,
+                author_name=names.get(author_id),
+                confidence_rank=rank,
+            )
+            for work_id, (relation_id, author_id, rank) in primary.items()
+        ]
+
+    def expected(self):
+        """Compute the rows for all works from the live relations"""
+        return self._compute(PersonAuthorOfWork.objects.all())
+
+    def refresh(self, work_ids):
+        """Recompute the primary author of the given works"""
+        work_ids = {pk for pk in work_ids if pk}
+        if not work_ids:
+            return
+        rows = self._compute(
+            PersonAuthorOfWork.objects.filter(obj_object_id__in=work_ids)
+        )
+        with transaction.atomic():
+            self.filter(work_id__in=work_ids).delete()
+            self.bulk_create(rows)
+
+    def rebuild(self):
+        """Recompute the primary author of all works from scratch"""
+        rows = self.expected()
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+
+class WorkPrimaryAuthor(models.Model):
+    """
+    Materialized primary author of a work, i.e. the subject of its best
+    ranked PersonAuthorOfWork relation, joined by
+    `WorkQuerySet.with_author`.
+    """
+
+    work = models.OneToOneField(
+        Work,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="primary_author",
+    )
+    relation_id = models.PositiveIntegerField(null=True, db_index=True)
+    author = models.ForeignKey(
+        Person,
+        null=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    author_name = models.CharField(max_length=255, blank=True, null=True)
+    confidence_rank = models.PositiveSmallIntegerField(default=3)
+
+    objects = WorkPrimaryAuthorManager()
+
+    def __str__(self):
+        return f"{self.work_id}: {self.author_name} ({self.author_id})"
+
+
 class InstanceQuerySet(QuerySet):
     def with_author(self):
+        # work and author are read from the denormalized InstanceWorkAuthor
+        # table, which is a single LEFT JOIN instead of nested subqueries
         return self.annotate(
-            # Subquery to get the Person ID related to the Work through PersonAuthorOfWork
-            work_id=Subquery(
-                WorkHasAsAnInstanceInstance.objects.filter(
-                    obj_object_id=OuterRef("id")
-                ).values("subj_object_id")[:1]
-            ),
-            author_id=get_author_id_subquery(OuterRef("work_id")),
-            author_name=get_author_name_subquery(OuterRef("author_id")),
+            work_id=F("work_author__work_id"),
+            author_id=F("work_author__author_id"),
+            author_name=F("work_author__author_name"),
         )
 
 
 class InstanceManager(TibScholEntityManager):
     def get_queryset(self):
-        return (
-            InstanceQuerySet(self.model, using=self._db)
-            .filter(id__in=super().get_queryset().values_list("id", flat=True))
-            .with_author()
-        )
+        return InstanceQuerySet(self.model, using=self._db).with_author()
 
 
 class Instance(VersionMixin, LegacyStuffMixin, TibScholEntityMixin, AbstractEntity):
@@ -376,6 +507,427 @@ class Instance(VersionMixin, LegacyStuffMixin, TibScholEntityMixin, AbstractEnti
     objects = InstanceManager()
 
 
+class InstanceWorkAuthorManager(models.Manager):
+    def _compute(self, relations, authors=None):
+        """
+        Pick the work (by confidence, then relation id) of every instance
+        touched by the `relations` queryset and return unsaved
+        InstanceWorkAuthor rows carrying that work's primary author, taken
+        from `authors` (work id -> (author id, author name)) or else from
+        the stored WorkPrimaryAuthor rows.
+        """
+        primary = get_primary_subjects(relations, Instance)
+        if authors is None:
+            work_ids = {work_id for _, work_id, _ in primary.values()}
+            authors = {
+                work_id: (author_id, author_name)
+                for work_id, author_id, author_name in WorkPrimaryAuthor.objects.filter(
+                    work_id__in=work_ids
+                ).values_list("work_id", "author_id", "author_name")
+            }
+        return [
+            self.model(
+                instance_id=instance_id,
+                relation_id=relation_id,
+                work_id=work_id,
+                author_id=authors.get(work_id, (None, None))[0],
+                author_name=authors.get(work_id, (None, None))[1],
+            )
+            for instance_id, (relation_id, work_id, _) in primary.items()
+        ]
+
+    def expected(self):
+        """
+        Compute the rows for all instances from the live relations, with
+        the primary authors computed from the relations as well, so that
+        drift in WorkPrimaryAuthor is not copied into the expected rows
+        """
+        authors = {
+            row.work_id: (row.author_id, row.author_name)
+            for row in WorkPrimaryAuthor.objects.expected()
+        }
+        return self._compute(WorkHasAsAnInstanceInstance.objects.all(), authors)
+
+    def refresh(self, instance_ids):
+        """Recompute work and author of the given instances"""
+        instance_ids = {pk for pk in instance_ids if pk}
+        if not instance_ids:
+            return
+        rows = self._compute(
+            WorkHasAsAnInstanceInstance.objects.filter(obj_object_id__in=instance_ids)
+        )
+        with transaction.atomic():
+            self.filter(instance_id__in=instance_ids).delete()
+            self.bulk_create(rows)
+
+    def refresh_authors(self, work_ids):
+        """Copy the current primary author of the given works to their instances"""
+        work_ids = {pk for pk in work_ids if pk}
+        if not work_ids:
+            return
+        primary = WorkPrimaryAuthor.objects.filter(work_id=OuterRef("work_id"))
+        self.filter(work_id__in=work_ids).update(
+            author_id=Subquery(primary.values("author_id")[:1]),
+            author_name=Subquery(primary.values("author_name")[:1]),
+        )
+
+    def rebuild(self):
+        """Recompute work and author of all instances from scratch"""
+        rows = self.expected()
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+
+class InstanceWorkAuthor(models.Model):
+    """
+    Denormalized work and primary author of an instance, following its
+    WorkHasAsAnInstanceInstance relation and the work's WorkPrimaryAuthor,
+    joined by `InstanceQuerySet.with_author`.
+    """
+
+    instance = models.OneToOneField(
+        Instance,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="work_author",
+    )
+    relation_id = models.PositiveIntegerField(null=True, db_index=True)
+    work = models.ForeignKey(
+        Work,
+        null=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    author = models.ForeignKey(
+        Person,
+        null=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+",
+    )
+    author_name = models.CharField(max_length=255, blank=True, null=True)
+
+    objects = InstanceWorkAuthorManager()
+
+    def __str__(self):
+        return f"{self.instance_id}: {self.work_id} / {self.author_name} ({self.author_id})"
+
+
+def tokenize_reference(value):
+    """
+    Split a TibSchol reference field into its normalized tokens: the
+    lowercased runs of word characters, e.g. "3_061_06" or "sb".
+    """
+    return set(re.findall(r"\w+", (value or "").lower()))
+
+
+class InstanceReferenceManager(models.Manager):
+    def _compute(self, instances):
+        return [
+            self.model(instance_id=pk, token=token)
+            for pk, tibschol_ref in instances
+            for token in tokenize_reference(tibschol_ref)
+        ]
+
+    def refresh(self, instances):
+        """Re-index the TibSchol references of the given instances"""
+        instances = [(instance.pk, instance.tibschol_ref) for instance in instances]
+        with transaction.atomic():
+            self.filter(instance_id__in=[pk for pk, _ in instances]).delete()
+            self.bulk_create(self._compute(instances))
+
+    def rebuild(self):
+        """Re-index the TibSchol references of all instances"""
+        rows = self._compute(
+            Instance.objects.exclude(tibschol_ref__isnull=True)
+            .exclude(tibschol_ref="")
+            .values_list("pk", "tibschol_ref")
+        )
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    def lookup(self, references):
+        """
+        Map each of the `references` to the ids of the instances whose
+        TibSchol reference contains it as a whole, delimited by non-word
+        characters (case-insensitive). The token index narrows down the
+        candidates in one query, which are then checked against the
+        reference, so that tokens in another order do not match.
+        """
+        tokens = {ref: tokenize_reference(ref) for ref in references}
+        instance_ids = {}
+        tibschol_refs = {}
+        for token, instance_id, tibschol_ref in self.filter(
+            token__in=set().union(*tokens.values())
+        ).values_list("token", "instance_id", "instance__tibschol_ref"):
+            instance_ids.setdefault(token, set()).add(instance_id)
+            tibschol_refs[instance_id] = tibschol_ref
+        matches = {}
+        for ref, ref_tokens in tokens.items():
+            if not ref_tokens:
+                matches[ref] = set()
+                continue
+            pattern = re.compile(rf"(?mi)(^|\W){re.escape(ref)}(\W|$)")
+            matches[ref] = {
+                pk
+                for pk in set.intersection(
+                    *[instance_ids.get(t, set()) for t in ref_tokens]
+                )
+                if pattern.search(tibschol_refs[pk])
+            }
+        return matches
+
+
+class InstanceReference(models.Model):
+    """
+    Token index of `Instance.tibschol_ref`, so that instances can be looked
+    up by reference with an indexed query instead of a regex scan.
+    """
+
+    token = models.CharField(max_length=255, db_index=True)
+    instance = models.ForeignKey(
+        Instance, on_delete=models.CASCADE, related_name="reference_tokens"
+    )
+
+    objects = InstanceReferenceManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["token", "instance"], name="unique_instance_reference"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.token}: {self.instance_id}"
+
+
+def get_alternative_labels(value):
+    """
+    The labels of an `alternative_names` value, which is a list of
+    {"language", "label"} items, a {language: label} mapping or (in
+    legacy records) newline separated text.
+    """
+    if not value:
+        return []
+    if isinstance(value, dict):
+        return [str(label) for label in value.values() if label]
+    if isinstance(value, list):
+        return [
+            str(item.get("label", "")) if isinstance(item, dict) else str(item)
+            for item in value
+            if item
+        ]
+    return [label.strip() for label in str(value).split("\n") if label.strip()]
+
+
+# search document weights: A for the name, B for the alternative labels,
+# C for the Tibetan script and D for the comments
+SEARCH_DOCUMENT_VECTOR = (
+    SearchVector("label", weight="A", config="simple")
+    + SearchVector("alternative_labels", weight="B", config="simple")
+    + SearchVector("transliteration", weight="C", config="simple")
+    + SearchVector("search_text", weight="D", config="simple")
+)
+
+
+def get_entity_models():
+    return sorted(TibScholEntityMixin.__subclasses__(), key=lambda m: m.__name__)
+
+
+def get_entity_names(model, entity_ids=None, fields=()):
+    """
+    Yield (pk, name, alternative labels, Tibetan transliteration, *fields)
+    for the entities of `model`, or only those with the given ids. The
+    name of a place is its label.
+    """
+    name_field = "label" if model is Place else "name"
+    entities = model.objects.all()
+    if entity_ids is not None:
+        entities = entities.filter(pk__in=entity_ids)
+    for pk, name, alternative_names, transliteration, *values in entities.values_list(
+        "pk", name_field, "alternative_names", "tibetan_transliteration", *fields
+    ):
+        yield (
+            pk,
+            name or "",
+            get_alternative_labels(alternative_names),
+            transliteration or "",
+            *values,
+        )
+
+
+class SearchDocumentManager(models.Manager):
+    def _compute(self, model, entity_ids=None):
+        return [
+            self.model(
+                entity_id=pk,
+                entity_type=model.__name__,
+                label=name,
+                alternative_labels="\n".join(alternative_labels),
+                transliteration=transliteration,
+                search_text=comments or "",
+            )
+            for pk, name, alternative_labels, transliteration, comments in (
+                get_entity_names(model, entity_ids, ["comments"])
+            )
+        ]
+
+    def refresh(self, model, entity_ids):
+        """Recompute the search documents of the given entities of `model`"""
+        entity_ids = set(entity_ids)
+        with transaction.atomic():
+            self.filter(entity_id__in=entity_ids).delete()
+            self.bulk_create(self._compute(model, entity_ids))
+            self.filter(entity_id__in=entity_ids).update(
+                document=SEARCH_DOCUMENT_VECTOR
+            )
+
+    def rebuild(self):
+        """Recompute the search documents of all entities"""
+        with transaction.atomic():
+            self.all().delete()
+            for model in get_entity_models():
+                self.bulk_create(self._compute(model), batch_size=1000)
+            return self.update(document=SEARCH_DOCUMENT_VECTOR)
+
+    def search(self, value, entity_types=None):
+        """
+        Return the search documents matching all words of `value` (or
+        words starting with them), ordered by relevance. `entity_types`
+        are model names in any case, e.g. "person"; unknown ones raise a
+        ValueError.
+        """
+        if entity_types:
+            names = {
+                model.__name__.lower(): model.__name__ for model in get_entity_models()
+            }
+            types = {name.strip().lower() for name in entity_types if name.strip()}
+            invalid = types - names.keys()
+            if invalid:
+                raise ValueError(f"Unknown entity type: {', '.join(sorted(invalid))}")
+            entity_types = [names[entity_type] for entity_type in types]
+        # the words without the operators of the tsquery syntax
+        words = re.findall(r"[^\s&|!():*'<>\\]+", value or "")
+        if not words:
+            return self.none()
+        query = SearchQuery(
+            " & ".join(f"{word}:*" for word in words),
+            search_type="raw",
+            config="simple",
+        )
+        documents = self.filter(document=query)
+        if entity_types:
+            documents = documents.filter(entity_type__in=entity_types)
+        return documents.annotate(
+            rank=SearchRank(models.F("document"), query)
+        ).order_by("-rank", "label")
+
+
+class SearchDocument(models.Model):
+    """
+    The searchable text of an entity with its weighted full text vector.
+    """
+
+    entity = models.OneToOneField(
+        RootObject,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    entity_type = models.CharField(max_length=255, db_index=True)
+    label = models.TextField(blank=True, default="")
+    alternative_labels = models.TextField(blank=True, default="")
+    transliteration = models.TextField(blank=True, default="")
+    search_text = models.TextField(blank=True, default="")
+    document = SearchVectorField(null=True)
+
+    objects = SearchDocumentManager()
+
+    class Meta:
+        indexes = [GinIndex(fields=["document"], name="search_document_gin")]
+
+    def __str__(self):
+        return f"{self.entity_type} {self.entity_id}: {self.label}"
+
+    @property
+    def source_object_id(self):
+        return self.entity_id
+
+
+class NameKeyManager(models.Manager):
+    def _compute(self, model, entity_ids=None):
+        return [
+            self.model(entity_id=pk, key=key)
+            for pk, name, alternative_labels, transliteration in get_entity_names(
+                model, entity_ids
+            )
+            for key in {
+                tibetan_name_key(value)
+                for value in [name, transliteration, *alternative_labels]
+            }
+            if key
+        ]
+
+    def refresh(self, model, entity_ids):
+        """Recompute the name keys of the given entities of `model`"""
+        entity_ids = set(entity_ids)
+        with transaction.atomic():
+            self.filter(entity_id__in=entity_ids).delete()
+            self.bulk_create(self._compute(model, entity_ids))
+
+    def rebuild(self):
+        """Recompute the name keys of all entities"""
+        rows = []
+        for model in get_entity_models():
+            rows.extend(self._compute(model))
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    def matching(self, value):
+        """
+        Return a subquery of the ids of the entities with a name, an
+        alternative label or a Tibetan script containing `value`, in
+        either script. A value without a key (only punctuation) matches
+        nothing rather than every key.
+        """
+        key = tibetan_name_key(value)
+        if not key:
+            return self.none().values("entity_id")
+        return self.filter(key__contains=key).values("entity_id")
+
+
+class NameKey(models.Model):
+    """
+    The script-agnostic keys (see `utils.tibetan_name_key`) of the names,
+    alternative labels and Tibetan script of an entity, with a trigram
+    index, so that searches in Wylie or Unicode Tibetan use the same
+    index entries.
+    """
+
+    entity = models.ForeignKey(
+        RootObject, on_delete=models.CASCADE, related_name="name_keys"
+    )
+    key = models.TextField()
+
+    objects = NameKeyManager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["key"], opclasses=["gin_trgm_ops"], name="name_key_trgm")
+        ]
+
+    def __str__(self):
+        return f"{self.entity_id}: {self.key}"
+
+
 class ZoteroEntry(GenericModel, models.Model):
     zoteroId = models.CharField(
         max_length=255, db_index=True, verbose_name=_("Zotero ID")
@@ -387,6 +939,7 @@ class ZoteroEntry(GenericModel, models.Model):
     year = models.CharField(
         max_length=255, blank=True, null=True, verbose_name=_("Year of publication")
     )
+    modified = models.DateTimeField(auto_now=True, null=True, editable=False)
 
     class Meta:
         verbose_name = _("zotero entry")
@@ -405,11 +958,36 @@ class Excerpts(GenericModel, models.Model):
     )  # populated from //tei:idno[@type="Zotero"]/text()
     status = models.CharField(max_length=255, blank=True)
     location = models.CharField(max_length=255, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    modified = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = _("excerpt")
         verbose_name_plural = _("excerpts")
 
+    def compute_content_hash(self):
+        return hash_content(
+            self.xml_content,
+            self.source,
+            self.tibschol_refs,
+            self.zotero_refs,
+            self.status,
+            self.location,
+        )
+
+    def citing_relations(self):
+        """The relations citing this excerpt in their `tei_refs`"""
+        return Relation.objects.filter(
+            excerpt_links__xml_id=self.xml_id
+        ).select_subclasses()
+
+    def save(self, *args, **kwargs):
+        new_hash = self.compute_content_hash()
+        if new_hash != self.content_hash or not self.modified:
+            self.content_hash = new_hash
+            self.modified = timezone.now()
+        super().save(*args, **kwargs)
+
 
 #######################################################################################
 ###################################RELATIONS###########################################
@@ -473,6 +1051,182 @@ def enforce_meta_attributes(sender, **kwargs):  # type: ignore
 class_prepared.connect(enforce_meta_attributes)
 
 
+# One pass over a `tei_refs` text finds line breaks and words; a word is
+# an excerpt id if it starts with "xml:id=" or contains "ex" followed by
+# a digit or "X" at a word boundary (e.g. "ex12a", "exX3", "(ex4),").
+TEI_REF_TOKEN = re.compile(
+    r"(?P<newline>\n)|(?P<excerpt>(?:xml:id=|\S*?\bex[\dX])\S*)|\S+"
+)
+
+
+def clean_excerpt_id(word):
+    """
+    Return the id as written (e.g. `ex12a,`) and the excerpt id without
+    surrounding punctuation (`ex12a`) of a word citing an excerpt.
+    """
+    true_id = word.replace('"', "").replace("xml:id=", "").strip().rstrip(".")
+    return true_id, true_id.strip(string.punctuation)
+
+
+def get_excerpt_ids(value):
+    """The ids of the excerpts cited in a `tei_refs` text, in order"""
+    xml_ids = []
+    for match in TEI_REF_TOKEN.finditer(value or ""):
+        if match.lastgroup == "excerpt":
+            true_id, xml_id = clean_excerpt_id(match.group())
+            if xml_id and xml_id not in xml_ids:
+                xml_ids.append(xml_id)
+    return xml_ids
+
+
+class RelationExcerptManager(models.Manager):
+    def _compute(self, relations):
+        return [
+            self.model(relation_id=pk, xml_id=xml_id)
+            for pk, tei_refs in relations
+            for xml_id in get_excerpt_ids(tei_refs)
+        ]
+
+    def refresh(self, relations):
+        """Re-link the given relations to the excerpts they cite"""
+        relations = [(relation.pk, relation.tei_refs) for relation in relations]
+        with transaction.atomic():
+            self.filter(relation_id__in=[pk for pk, _ in relations]).delete()
+            self.bulk_create(self._compute(relations))
+
+    def rebuild(self):
+        """Re-link all relations to the excerpts they cite"""
+        rows = []
+        for model in TibScholRelationMixin.__subclasses__():
+            rows.extend(
+                self._compute(
+                    model.objects.exclude(tei_refs__isnull=True)
+                    .exclude(tei_refs="")
+                    .values_list("pk", "tei_refs")
+                )
+            )
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    def in_use(self):
+        """The excerpts cited by at least one relation"""
+        return Excerpts.objects.filter(xml_id__in=self.values("xml_id"))
+
+    def missing(self):
+        """The links to excerpt ids that have no excerpt"""
+        return self.exclude(xml_id__in=Excerpts.objects.values("xml_id"))
+
+
+class RelationExcerpt(models.Model):
+    """
+    The excerpts cited in `tei_refs` of a relation, one row per relation
+    and excerpt id, so that relations can be joined with their excerpts
+    instead of parsing the free text. The excerpt is referenced by its
+    id rather than a foreign key, to keep track of citations of excerpts
+    that have not been imported.
+    """
+
+    relation = models.ForeignKey(
+        Relation, on_delete=models.CASCADE, related_name="excerpt_links"
+    )
+    xml_id = models.CharField(max_length=255, db_index=True)
+
+    objects = RelationExcerptManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["relation", "xml_id"], name="unique_relation_excerpt"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.relation_id}: {self.xml_id}"
+
+
+class RelationParticipationManager(models.Manager):
+    def _compute(self, relations):
+        return [
+            self.model(
+                relation_id=relation.pk,
+                relation_class=type(relation).__name__,
+                role=role,
+                entity_id=entity_id,
+            )
+            for relation in relations
+            for role, entity_id in [
+                (self.model.SUBJECT, relation.subj_object_id),
+                (self.model.OBJECT, relation.obj_object_id),
+            ]
+            if entity_id is not None
+        ]
+
+    def refresh(self, relations):
+        """Recompute the participations of the given relations"""
+        relations = list(relations)
+        with transaction.atomic():
+            self.filter(
+                relation_id__in=[relation.pk for relation in relations]
+            ).delete()
+            self.bulk_create(self._compute(relations))
+
+    def rebuild(self):
+        """Recompute the participations of all relations"""
+        rows = []
+        for model in TibScholRelationMixin.__subclasses__():
+            rows.extend(
+                self._compute(model.objects.only("subj_object_id", "obj_object_id"))
+            )
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    def participants(self, relation_class, role=None):
+        """
+        Return a subquery of the ids of the entities taking part in a
+        relation of `relation_class` (as subject or object, if given).
+        """
+        participations = self.filter(relation_class=relation_class)
+        if role:
+            participations = participations.filter(role=role)
+        return participations.values("entity_id")
+
+
+class RelationParticipation(models.Model):
+    """
+    Which entities take part in which relation classes and in which role,
+    so that "entities with any relation of a class" is an indexed
+    semi-join.
+    """
+
+    SUBJECT = "subj"
+    OBJECT = "obj"
+    ROLES = [(SUBJECT, "Subject"), (OBJECT, "Object")]
+
+    relation = models.ForeignKey(
+        Relation, on_delete=models.CASCADE, related_name="participations"
+    )
+    relation_class = models.CharField(max_length=255)
+    role = models.CharField(max_length=4, choices=ROLES)
+    entity_id = models.PositiveIntegerField(db_index=True)
+
+    objects = RelationParticipationManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["relation_class", "entity_id"],
+                name="relation_participation_class",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.entity_id} {self.role} {self.relation_class} {self.relation_id}"
+
+
 class PersonActiveAtPlace(TibScholRelationMixin):
     subj_model = Person
     obj_model = Place
@@ -0,0 +1,24 @@
+from django.db.models import QuerySet, prefetch_related_objects
+
+
+def prefetch_relation_entities(relations):
+    """
+    Prefetch the subject and object entities of relations. The generic
+    foreign keys are grouped by content type, so every entity class is
+    loaded with one query instead of one query per side per relation.
+    Works on querysets (lazily) and on lists of relations (in place).
+    """
+    if relations is None:
+        return relations
+    if isinstance(relations, QuerySet):
+        return relations.prefetch_related("subj", "obj")
+    prefetch_related_objects(list(relations), "subj", "obj")
+    return relations
+
+
+def TibScholRelationMixinListViewQueryset(queryset):
+    return prefetch_relation_entities(queryset.select_subclasses())
+
+
+def TibScholRelationMixinViewSetQueryset(queryset):
+    return prefetch_relation_entities(queryset.select_subclasses())
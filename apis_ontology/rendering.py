@@ -0,0 +1,153 @@
+import logging
+
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from .caches import (
+    RENDERED_HTML_TIMEOUT,
+    hash_content,
+    rendered_html_generation,
+    rendered_html_key,
+)
+from .templatetags.filter_utils import render_list_field
+from .templatetags.parse_comment import CommentReferences, parse_comment
+from .templatetags.render_tei_refs import render_tei_refs
+
+logger = logging.getLogger(__name__)
+
+
+def render_comment(value, references=None):
+    return render_tei_refs(parse_comment(value, references))
+
+
+def render_notes(value, references=None):
+    return parse_comment(render_list_field(value), references)
+
+
+def render_relation_references(relation, references=None):
+    return mark_safe(
+        (
+            render_tei_refs(getattr(relation, "tei_refs", "") or "")
+            .replace("<br />", ", ")
+            .rstrip(", ")
+            + "<br />"
+            if getattr(relation, "tei_refs")
+            else ""
+        )
+        + parse_comment(
+            render_list_field(
+                f"{getattr(relation,'support_notes', '') or ''}\n{getattr(relation, 'zotero_refs','')  or ''}",
+            ),
+            references,
+        )
+    )
+
+
+# rendered field -> (model fields it is rendered from, render function)
+RENDERED_FIELDS = {
+    "comments": (
+        ["comments"],
+        lambda obj, references: render_comment(obj.comments, references),
+    ),
+    "item_description": (
+        ["item_description"],
+        lambda obj, references: render_comment(obj.item_description, references),
+    ),
+    "support_notes": (
+        ["support_notes"],
+        lambda obj, references: render_notes(obj.support_notes, references),
+    ),
+    "zotero_refs": (
+        ["zotero_refs"],
+        lambda obj, references: render_notes(obj.zotero_refs, references),
+    ),
+    "tei_refs": (
+        ["tei_refs"],
+        lambda obj, references: render_tei_refs(obj.tei_refs or ""),
+    ),
+    "references": (
+        ["tei_refs", "support_notes", "zotero_refs"],
+        render_relation_references,
+    ),
+}
+
+RENDERED_SOURCE_FIELDS = {
+    source for sources, render in RENDERED_FIELDS.values() for source in sources
+}
+
+
+def rendered_fields(obj):
+    """The rendered fields that apply to the model of `obj`"""
+    return [
+        field
+        for field, (sources, render) in RENDERED_FIELDS.items()
+        if all(hasattr(obj, source) for source in sources)
+    ]
+
+
+class RenderedHTML:
+    """
+    The rendered HTML of comment-like fields, cached per object and field
+    under the hash of the field contents, so that unchanged text is not
+    parsed again. `prefetch` fetches the HTML of many objects with one
+    cache lookup and renders the missing entries with their references
+    resolved at once.
+    """
+
+    def __init__(self, references=None):
+        self.references = references or CommentReferences()
+        self.html = {}
+        self._generation = None
+
+    @property
+    def generation(self):
+        """Read once, the keys of one page all use the same generation"""
+        if self._generation is None:
+            self._generation = rendered_html_generation()
+        return self._generation
+
+    def key(self, obj, field):
+        sources, render = RENDERED_FIELDS[field]
+        content_hash = hash_content(*(getattr(obj, source) for source in sources))
+        return rendered_html_key(obj, field, content_hash, self.generation)
+
+    def prefetch(self, objects, fields=None, refresh=False):
+        keys = {}
+        for obj in objects:
+            for field in rendered_fields(obj):
+                if fields is not None and field not in fields:
+                    continue
+                keys[self.key(obj, field)] = (obj, field)
+        if refresh:
+            missing = keys
+        else:
+            cached = cache.get_many([key for key in keys if key not in self.html])
+            self.html.update(cached)
+            missing = {key: keys[key] for key in keys if key not in self.html}
+        if not missing:
+            return self
+
+        self.references.resolve(
+            getattr(obj, source)
+            for obj, field in missing.values()
+            for source in RENDERED_FIELDS[field][0]
+        )
+        rendered = {
+            key: str(RENDERED_FIELDS[field][1](obj, self.references))
+            for key, (obj, field) in missing.items()
+        }
+        cache.set_many(rendered, RENDERED_HTML_TIMEOUT)
+        self.html.update(rendered)
+        logger.debug("Rendered %s of %s fields", len(rendered), len(keys))
+        return self
+
+    def get(self, obj, field):
+        key = self.key(obj, field)
+        if key not in self.html:
+            self.prefetch([obj], [field])
+        return mark_safe(self.html[key])
+
+
+def refresh_rendered_html(obj):
+    """Render the fields of a saved object into the cache"""
+    RenderedHTML().prefetch([obj], refresh=True)
@@ -0,0 +1,47 @@
+from django.db import models
+from django.db.models.functions import Upper
+from django.db.models.lookups import Contains
+
+from .models import NameKey
+from .utils import tibetan_name_key
+
+# Immutable wrapper of unaccent, created in migration 0085, so that it
+# can be used in the trigram index expressions
+UNACCENT_FUNCTION = "tibschol_unaccent"
+
+
+class ImmutableUnaccent(models.Func):
+    function = UNACCENT_FUNCTION
+    output_field = models.TextField()
+
+
+def search_expression(field):
+    """
+    The expression the trigram indexes are built on; queries have to use
+    exactly this expression for the planner to pick the index.
+    """
+    return Upper(ImmutableUnaccent(field))
+
+
+def unaccent_icontains(field, value):
+    """
+    Case and accent insensitive `contains` on `field` that is answered
+    from its trigram index, like `field__unaccent__icontains=value`.
+    """
+    return Contains(
+        search_expression(field), Upper(ImmutableUnaccent(models.Value(value)))
+    )
+
+
+def name_search_query(name_field, value):
+    """
+    Match `value` against the name of an entity and, through their
+    script-agnostic keys, against the names, alternative labels and
+    Tibetan transliteration in Wylie or Unicode Tibetan. The alternative
+    names are only matched through their keys: their JSON text also holds
+    the "label" and "language" keys and the language codes.
+    """
+    query = models.Q(unaccent_icontains(name_field, value))
+    if tibetan_name_key(value):
+        query |= models.Q(pk__in=NameKey.objects.matching(value))
+    return query
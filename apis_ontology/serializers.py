@@ -8,6 +8,8 @@ from drf_spectacular.utils import extend_schema_field
 from rest_framework.fields import SerializerMethodField
 from rest_framework.serializers import ModelSerializer
 
+from .querysets import prefetch_relation_entities
+
 
 class TibScholRelationMixinSerializer(ModelSerializer):
     label = SerializerMethodField()
@@ -49,7 +51,7 @@ class TibScholEntityMixinSerializer(GenericHyperlinkedModelSerializer):
     def get_relations(self, obj):
         subj_rels = Relation.objects.filter(subj_object_id=obj.pk).select_subclasses()
         obj_rels = Relation.objects.filter(obj_object_id=obj.pk).select_subclasses()
-        combined = list(subj_rels) + list(obj_rels)
+        combined = prefetch_relation_entities(list(subj_rels) + list(obj_rels))
         serialized = []
         request = self.context.get("request")
 
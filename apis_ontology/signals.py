@@ -1,6 +1,29 @@
-from django.db.models.signals import pre_save, post_save
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
 
-from apis_ontology.models import Instance, Person, Place, Work
+from apis_ontology.models import (
+    Instance,
+    InstanceReference,
+    InstanceWorkAuthor,
+    NameKey,
+    Person,
+    PersonAuthorOfWork,
+    Place,
+    RelationExcerpt,
+    RelationParticipation,
+    SearchDocument,
+    TibScholRelationMixin,
+    Work,
+    WorkHasAsAnInstanceInstance,
+    WorkPrimaryAuthor,
+    ZoteroEntry,
+    get_entity_models,
+)
+from apis_ontology.bulk_utils import relations_are_handled, relations_changed
+from apis_ontology.caches import zotero_cache
+from apis_ontology.rendering import RENDERED_SOURCE_FIELDS, refresh_rendered_html
+from apis_ontology.transliteration import to_tibetan_many
 from apis_ontology.utils import latin_to_tibetan
 
 
@@ -15,11 +38,14 @@ def get_tibetan_transliteration(obj):
         return ""
     # Instance: only if it is an instance of a work whose language is Tibetan
     if obj.__class__.__name__ == "Instance":
-        from apis_ontology.models import Work, WorkHasAsAnInstanceInstance
-
-        rel = WorkHasAsAnInstanceInstance.objects.filter(obj_object_id=obj.pk).first()
-        work = Work.objects.filter(pk=rel.subj_object_id).first() if rel else None
-        if work and work.original_language == "Tibetan" and getattr(obj, "name", None):
+        if not getattr(obj, "name", None):
+            return ""
+        language = (
+            InstanceWorkAuthor.objects.filter(instance_id=obj.pk)
+            .values_list("work__original_language", flat=True)
+            .first()
+        )
+        if language == "Tibetan":
             return latin_to_tibetan(obj.name)
         return ""
     # Person: only if nationality == 'Tibetan'
@@ -40,20 +66,38 @@ def update_transliteration(sender, instance, **kwargs):
     if kwargs.get("created", False):
         new_translit = get_tibetan_transliteration(instance)
         if instance.tibetan_transliteration != new_translit:
+            # mark the current value as loaded, so that pre_save of the
+            # following save keeps the new value
+            instance.snapshot_tracked_fields()
             instance.tibetan_transliteration = new_translit
             instance.save(update_fields=["tibetan_transliteration"])
         return
 
     # If called from pre_save (update), only run if instance.pk exists (i.e., not creation)
     if instance.pk:
-        model = type(instance)
-        try:
-            old = model.objects.get(pk=instance.pk)
-        except model.DoesNotExist:
-            old = None
+        # the values the object was loaded with tell whether the user edited
+        # the transliteration; only objects not loaded from the database
+        # (or with the field deferred) need to be looked up
+        changed = instance.tracked_field_changed("tibetan_transliteration")
+        if changed is None:
+            old = (
+                type(instance)
+                ._base_manager.filter(pk=instance.pk)
+                .values_list("tibetan_transliteration", flat=True)
+                .first()
+            )
+            changed = old is not None and old != instance.tibetan_transliteration
 
         # If the transliteration field was changed by the user, always persist it as-is (do nothing)
-        if old and old.tibetan_transliteration != instance.tibetan_transliteration:
+        if changed:
+            return
+
+        # nothing the transliteration depends on was edited
+        if not any(
+            instance.tracked_field_changed(name) is not False
+            for name in ["name", "label", "original_language", "nationality"]
+            if hasattr(instance, name)
+        ):
             return
 
         # Otherwise, update if needed
@@ -67,9 +111,47 @@ def update_transliteration(sender, instance, **kwargs):
 for model in [Person, Place, Work, Instance]:
     pre_save.connect(update_transliteration, sender=model)
     post_save.connect(update_transliteration, sender=model)
+
+
+def recompute_instance_transliterations(instance_ids):
+    """
+    Recompute the transliteration of the given instances from their
+    current work (as stored in InstanceWorkAuthor) and write the changed
+    ones with a single bulk update.
+    """
+    rows = list(
+        Instance.objects.filter(pk__in=instance_ids).values_list(
+            "pk",
+            "name",
+            "work_author__work__original_language",
+            "tibetan_transliteration",
+        )
+    )
+    names = [
+        name if language == "Tibetan" and name else ""
+        for _, name, language, _ in rows
+    ]
+    changes = [
+        Instance(pk=pk, tibetan_transliteration=tibetan)
+        for (pk, _, _, current), tibetan in zip(rows, to_tibetan_many(names))
+        if current != tibetan
+    ]
+    Instance.objects.bulk_update(changes, ["tibetan_transliteration"])
+    SearchDocument.objects.refresh(Instance, [instance.pk for instance in changes])
+    NameKey.objects.refresh(Instance, [instance.pk for instance in changes])
+
+
+def schedule_instance_transliterations(instance_ids):
+    """Recompute the instance transliterations once the transaction commits"""
+    instance_ids = {pk for pk in instance_ids if pk}
+    if instance_ids:
+        transaction.on_commit(
+            lambda: recompute_instance_transliterations(instance_ids)
+        )
 import os
 
 from apis_core.apis_entities.models import RootObject
+from apis_core.generic.signals import post_merge_with
 from apis_core.relations.models import Relation
 from django.contrib.auth.models import Group
 from django.contrib.auth.signals import user_logged_in
@@ -87,5 +169,189 @@ def add_to_group(sender, user, request, **kwargs):
 
 @receiver(pre_delete, sender=RootObject)
 def cascade_delete_related(sender, instance, **kwargs):
+    if relations_are_handled():
+        return
     Relation.objects.filter(subj_object_id=instance.pk).delete()
     Relation.objects.filter(obj_object_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=PersonAuthorOfWork)
+@receiver(post_delete, sender=PersonAuthorOfWork)
+def update_primary_author(sender, instance, **kwargs):
+    # the work the relation points to now, plus any work this relation
+    # was the primary author relation of (in case the object changed)
+    work_ids = {instance.obj_object_id}
+    work_ids.update(
+        WorkPrimaryAuthor.objects.filter(relation_id=instance.pk).values_list(
+            "work_id", flat=True
+        )
+    )
+    WorkPrimaryAuthor.objects.refresh(work_ids)
+    InstanceWorkAuthor.objects.refresh_authors(work_ids)
+
+
+@receiver(post_save, sender=WorkHasAsAnInstanceInstance)
+@receiver(post_delete, sender=WorkHasAsAnInstanceInstance)
+def update_instance_work_author(sender, instance, **kwargs):
+    instance_ids = {instance.obj_object_id}
+    instance_ids.update(
+        InstanceWorkAuthor.objects.filter(relation_id=instance.pk).values_list(
+            "instance_id", flat=True
+        )
+    )
+    InstanceWorkAuthor.objects.refresh(instance_ids)
+    schedule_instance_transliterations(instance_ids)
+
+
+@receiver(relations_changed, sender=PersonAuthorOfWork)
+def update_primary_authors(sender, relation_ids, **kwargs):
+    work_ids = set(
+        PersonAuthorOfWork.objects.filter(pk__in=relation_ids).values_list(
+            "obj_object_id", flat=True
+        )
+    )
+    work_ids.update(
+        WorkPrimaryAuthor.objects.filter(relation_id__in=relation_ids).values_list(
+            "work_id", flat=True
+        )
+    )
+    WorkPrimaryAuthor.objects.refresh(work_ids)
+    InstanceWorkAuthor.objects.refresh_authors(work_ids)
+
+
+@receiver(relations_changed, sender=WorkHasAsAnInstanceInstance)
+def update_instance_work_authors(sender, relation_ids, **kwargs):
+    instance_ids = set(
+        WorkHasAsAnInstanceInstance.objects.filter(pk__in=relation_ids).values_list(
+            "obj_object_id", flat=True
+        )
+    )
+    instance_ids.update(
+        InstanceWorkAuthor.objects.filter(relation_id__in=relation_ids).values_list(
+            "instance_id", flat=True
+        )
+    )
+    InstanceWorkAuthor.objects.refresh(instance_ids)
+    schedule_instance_transliterations(instance_ids)
+
+
+@receiver(post_save, sender=Person)
+def update_primary_author_name(sender, instance, update_fields=None, **kwargs):
+    if update_fields and "name" not in update_fields:
+        return
+    WorkPrimaryAuthor.objects.filter(author_id=instance.pk).update(
+        author_name=instance.name
+    )
+    InstanceWorkAuthor.objects.filter(author_id=instance.pk).update(
+        author_name=instance.name
+    )
+
+
+@receiver(post_save, sender=Instance)
+def update_instance_reference_index(sender, instance, update_fields=None, **kwargs):
+    if update_fields and "tibschol_ref" not in update_fields:
+        return
+    InstanceReference.objects.refresh([instance])
+
+
+@receiver(post_save, sender=Work)
+def update_instance_transliterations(sender, instance, created, **kwargs):
+    # the loaded values are only replaced after post_save
+    if created or instance.tracked_field_changed("original_language") is False:
+        return
+    schedule_instance_transliterations(
+        InstanceWorkAuthor.objects.filter(work_id=instance.pk).values_list(
+            "instance_id", flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=ZoteroEntry)
+@receiver(post_delete, sender=ZoteroEntry)
+def invalidate_zotero_cache(sender, instance, **kwargs):
+    # the rendered comments showing the short titles are keyed by the
+    # version of the Zotero entries as well
+    zotero_cache.invalidate()
+
+
+def update_rendered_html(sender, instance, update_fields=None, **kwargs):
+    if fields_changed(update_fields, RENDERED_SOURCE_FIELDS):
+        transaction.on_commit(lambda: refresh_rendered_html(instance))
+
+
+SEARCH_DOCUMENT_FIELDS = {
+    "name",
+    "label",
+    "alternative_names",
+    "tibetan_transliteration",
+    "comments",
+}
+NAME_KEY_FIELDS = {"name", "label", "alternative_names", "tibetan_transliteration"}
+RELATION_ENDS = {"subj", "obj", "subj_object_id", "obj_object_id"}
+
+
+def fields_changed(update_fields, fields):
+    return not update_fields or bool(set(update_fields) & fields)
+
+
+def update_entity_projections(sender, instance, update_fields=None, **kwargs):
+    if fields_changed(update_fields, SEARCH_DOCUMENT_FIELDS):
+        SearchDocument.objects.refresh(sender, [instance.pk])
+    if fields_changed(update_fields, NAME_KEY_FIELDS):
+        NameKey.objects.refresh(sender, [instance.pk])
+
+
+def update_relation_projections(sender, instance, update_fields=None, **kwargs):
+    if fields_changed(update_fields, {"tei_refs"}):
+        RelationExcerpt.objects.refresh([instance])
+    if fields_changed(update_fields, RELATION_ENDS):
+        RelationParticipation.objects.refresh([instance])
+
+
+for model in get_entity_models():
+    post_save.connect(update_rendered_html, sender=model)
+    post_save.connect(update_entity_projections, sender=model)
+for model in TibScholRelationMixin.__subclasses__():
+    post_save.connect(update_rendered_html, sender=model)
+    post_save.connect(update_relation_projections, sender=model)
+
+
+@receiver(post_merge_with)
+def merge_relation_participations(sender, instance, entities, **kwargs):
+    # apis moves the relations of the merged entities with a bulk update
+    RelationParticipation.objects.filter(
+        entity_id__in=[entity.pk for entity in entities]
+    ).update(entity_id=instance.pk)
+
+
+@receiver(post_merge_with)
+def merge_author_projections(sender, instance, entities, **kwargs):
+    # apis' merge_relations receiver, connected before this one, has
+    # moved the relations of the merged entities to `instance` by now
+    entity_ids = {instance.pk, *(entity.pk for entity in entities)}
+    touching = Q(subj_object_id=instance.pk) | Q(obj_object_id=instance.pk)
+    work_ids = set(
+        PersonAuthorOfWork.objects.filter(touching).values_list(
+            "obj_object_id", flat=True
+        )
+    )
+    work_ids.update(
+        WorkPrimaryAuthor.objects.filter(
+            Q(work_id__in=entity_ids) | Q(author_id__in=entity_ids)
+        ).values_list("work_id", flat=True)
+    )
+    WorkPrimaryAuthor.objects.refresh(work_ids)
+    InstanceWorkAuthor.objects.refresh_authors(work_ids)
+
+    instance_ids = set(
+        WorkHasAsAnInstanceInstance.objects.filter(touching).values_list(
+            "obj_object_id", flat=True
+        )
+    )
+    instance_ids.update(
+        InstanceWorkAuthor.objects.filter(
+            Q(instance_id__in=entity_ids) | Q(work_id__in=entity_ids)
+        ).values_list("instance_id", flat=True)
+    )
+    InstanceWorkAuthor.objects.refresh(instance_ids)
+    schedule_instance_transliterations(instance_ids)
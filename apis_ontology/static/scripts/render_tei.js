@@ -191,11 +191,63 @@ let behaviors = {
 
 c.addBehaviors(behaviors);
 
+// payloads of the excerpts linked on the current page, by xml id
+const excerptCache = {};
+const EXCERPT_BATCH_SIZE = 50;
+
+// fetch the excerpts linked on the page in batches, so that opening
+// one of them does not need a request of its own
+function prefetchExcerpts() {
+  const ids = new Set();
+  for (let link of document.querySelectorAll("[data-excerpt-id]")) {
+    const id = link.dataset.excerptId;
+    if (id && !(id in excerptCache)) {
+      ids.add(id);
+    }
+  }
+  const pending = Array.from(ids);
+  for (let i = 0; i < pending.length; i += EXCERPT_BATCH_SIZE) {
+    const batch = pending.slice(i, i + EXCERPT_BATCH_SIZE);
+    const params = new URLSearchParams();
+    batch.forEach(id => params.append("xml_id", id));
+    const request = fetch(`/apis/excerpts/?${params}`)
+      .then(response => response.json())
+      .then(data => data.excerpts);
+    batch.forEach(id => {
+      excerptCache[id] = request.then(excerpts => {
+        if (!(id in excerpts)) {
+          throw new Error(`Excerpt ${id} not found`);
+        }
+        return excerpts[id];
+      });
+      // later requests go straight to the single excerpt request
+      excerptCache[id].catch(() => delete excerptCache[id]);
+    });
+  }
+}
+
+document.addEventListener("DOMContentLoaded", prefetchExcerpts);
+document.addEventListener("htmx:afterSettle", prefetchExcerpts);
+
+function fetchSingleExcerpt(recordId, renderStyle) {
+  return fetch(`/apis/excerpts/${recordId}/${renderStyle}`)
+    .then(response => response.json());
+}
+
+function fetchExcerpt(recordId, renderStyle) {
+  if (recordId in excerptCache) {
+    // fall back to the single excerpt request if the batch failed, also
+    // when it was still pending at the time of the click
+    return excerptCache[recordId]
+      .catch(() => fetchSingleExcerpt(recordId, renderStyle));
+  }
+  return fetchSingleExcerpt(recordId, renderStyle);
+}
+
 function showExcerpt(recordId, renderStyle) {
   document.getElementById("popupContent").innerHTML = "";
   renderStyle = "tei";
-  fetch(`/apis/excerpts/${recordId}/${renderStyle}`)
-    .then(response => response.json())
+  fetchExcerpt(recordId, renderStyle)
     .then(teidata => {
       console.log("TEI DATA",teidata);
       // show raw teidata in the element #rawTEI as text
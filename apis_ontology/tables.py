@@ -13,13 +13,22 @@ from django.db.models import OuterRef, Subquery
 from django.db.models import Value
 from django.db.models.functions import Coalesce
 
-from .models import Instance, Person, Place, Work
+from .models import (
+    Instance,
+    InstanceWorkAuthor,
+    Person,
+    Place,
+    Work,
+    WorkPrimaryAuthor,
+)
+from .querysets import prefetch_relation_entities
 from .templatetags.filter_utils import (
     render_coordinate,
     render_links,
     render_list_field,
 )
-from .templatetags.parse_comment import parse_comment
+from .rendering import RenderedHTML, render_relation_references, rendered_fields
+from .templatetags.parse_comment import comment_references
 from .templatetags.render_tei_refs import render_tei_refs
 
 from datetime import datetime
@@ -70,8 +79,8 @@ class TibscholEntityMixinTable(GenericTable):
     def render_external_links(self, value):
         return render_links(value)
 
-    def render_comments(self, value):
-        return mark_safe(render_tei_refs(parse_comment(value)))
+    def render_comments(self, record):
+        return get_rendered_html(self).get(record, "comments")
 
     name = tables.Column(
         linkify=lambda record: record.get_absolute_url(),
@@ -101,17 +110,106 @@ class TibscholEntityMixinTable(GenericTable):
             )
 
 
-class PersonDateColumn(tables.Column):
-    def render(self, value, *args, **kwargs):
-        try:
-            person = Person.objects.get(pk=value)
-        except Person.DoesNotExist:
-            return ""
-        return (
-            (person.start if person.start else "")
-            + " - "
-            + (person.end if person.end else "")
+def get_page_records(table):
+    """Return the records of the current page (or all records if not paginated)"""
+    return [row.record for row in table.paginated_rows]
+
+
+def get_rendered_html(table):
+    """
+    Fetch the rendered comment-like fields shown by the table for all
+    records on the current page at once, rendering (and caching) only
+    those whose contents are not cached yet; records outside the page
+    (e.g. during exports) are rendered when they are accessed.
+    """
+    if not hasattr(table, "_rendered_html"):
+        records = get_page_records(table)
+        fields = {
+            field
+            for record in records
+            for field in rendered_fields(record)
+            if field in table.columns
+        }
+        table._rendered_html = RenderedHTML().prefetch(records, fields)
+    return table._rendered_html
+
+
+def get_authors(work_or_instance_ids):
+    """
+    Resolve the primary author of works and instances in bulk.
+    Returns a dict mapping every given id to its author (or None).
+    """
+    author_ids = dict(
+        WorkPrimaryAuthor.objects.filter(work_id__in=work_or_instance_ids).values_list(
+            "work_id", "author_id"
         )
+    )
+    author_ids.update(
+        InstanceWorkAuthor.objects.filter(
+            instance_id__in=work_or_instance_ids
+        ).values_list("instance_id", "author_id")
+    )
+    persons = Person.objects.in_bulk(
+        {author_id for author_id in author_ids.values() if author_id}
+    )
+    return {pk: persons.get(author_ids.get(pk)) for pk in work_or_instance_ids}
+
+
+def render_lifespan(person):
+    if not person:
+        return ""
+    return (
+        (person.start if person.start else "")
+        + " - "
+        + (person.end if person.end else "")
+    )
+
+
+class PageLookupMixin:
+    """
+    Column mixin that resolves objects for all the records on the current
+    table page in one go, instead of querying once per row.
+    Subclasses set a `lookup_key` (columns with the same key share their
+    results) and `resolve_lookup`, a function that takes a set of ids and
+    returns a dict mapping them to objects. `get_lookup_id(record)` reads
+    the id from the column accessor unless overridden.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        missing = [
+            name
+            for name in ("lookup_key", "resolve_lookup")
+            if getattr(cls, name, None) is None
+        ]
+        if missing:
+            raise TypeError(f"{cls.__name__} must set {', '.join(missing)}")
+
+    def get_lookup_id(self, record):
+        return self.accessor.resolve(record, quiet=True)
+
+    def lookup(self, table, record):
+        if not hasattr(table, "_page_lookups"):
+            table._page_lookups = {}
+        resolved = table._page_lookups.setdefault(self.lookup_key, {})
+        pk = self.get_lookup_id(record)
+        if pk not in resolved:
+            ids = {self.get_lookup_id(r) for r in get_page_records(table)}
+            if pk not in ids:
+                # the record is not on the current page, e.g. during exports
+                ids = {self.get_lookup_id(r) for r in table.data}
+            ids = (ids | {pk}) - resolved.keys()
+            results = self.resolve_lookup({i for i in ids if i})
+            resolved.update({i: results.get(i) for i in ids})
+        return resolved[pk]
+
+
+class PersonDateColumn(PageLookupMixin, tables.Column):
+    lookup_key = "persons"
+    resolve_lookup = staticmethod(Person.objects.in_bulk)
+
+    def render(self, record, table, *args, **kwargs):
+        return render_lifespan(self.lookup(table, record))
 
     def order(self, queryset, is_descending):
         queryset = queryset.annotate(
@@ -132,8 +230,10 @@ class PersonDateColumn(tables.Column):
         return queryset, True
 
 
-class AuthorColumn(CustomTemplateColumn):
+class AuthorColumn(PageLookupMixin, CustomTemplateColumn):
     template_name = "apis_ontology/linked_entity_column.html"
+    lookup_key = "authors"
+    resolve_lookup = staticmethod(get_authors)
 
     def __init__(self, *args, **kwargs):
         self.orderable = kwargs.get("orderable", False)
@@ -145,55 +245,31 @@ class AuthorColumn(CustomTemplateColumn):
             **kwargs,
         )
 
-    @classmethod
-    def get_work_from_id(cls, work_instance_id):
-        try:
-            return Work.objects.get(pk=work_instance_id)
-        except Work.DoesNotExist:
-            # if the _object_id is not a work, look for an instance
-            try:
-                return Instance.objects.get(pk=work_instance_id)
-            except Instance.DoesNotExist:
-                logger.warn(
-                    "Unable to find work or instance for %s",
-                    work_instance_id,
-                )
-
     def render(self, record, table, value, *args, **kwargs):
-        subj_work = self.__class__.get_work_from_id(value)
-        if not subj_work:
+        author = self.lookup(table, record)
+        if not author:
             return ""
-        if getattr(subj_work, "author_id"):
-            try:
-                author = Person.objects.get(pk=getattr(subj_work, "author_id"))
-                self.extra_context = {
-                    "entity": author,
-                }
-                return super().render(record, table, author, **kwargs)
-            except Person.DoesNotExist:
-                # Author is deleted or not accessible to the user
-                logger.warning("Unable to find author for %s ", subj_work)
-
-        return ""
+        self.extra_context = {
+            "entity": author,
+        }
+        return super().render(record, table, author, **kwargs)
 
     def value(self, record, table, value, *args, **kwargs):
-        work = self.get_work_from_id(value)
-        if not work:
-            return ""
-        return getattr(work, "author_name", "")
+        author = self.lookup(table, record)
+        return author.name if author else ""
 
     def order(self, queryset, is_descending):
         queryset = queryset.annotate(
             author_str=Coalesce(
                 Subquery(
-                    Work.objects.filter(pk=OuterRef(self.accessor)).values(
-                        "author_name"
-                    )[:1]
+                    WorkPrimaryAuthor.objects.filter(
+                        work_id=OuterRef(self.accessor)
+                    ).values("author_name")[:1]
                 ),
                 Subquery(
-                    Instance.objects.filter(pk=OuterRef(self.accessor)).values(
-                        "author_name"
-                    )[:1]
+                    InstanceWorkAuthor.objects.filter(
+                        instance_id=OuterRef(self.accessor)
+                    ).values("author_name")[:1]
                 ),
                 Value(""),
             )
@@ -269,6 +345,10 @@ class WorkTable(TibscholEntityMixinTable):
     def value_export_topic(self, record):
         return "\n".join(str(sub) for sub in record.subject_vocab.all())
 
+    def order_author(self, queryset, is_descending):
+        queryset = queryset.order_by(("-" if is_descending else "") + "author_name")
+        return queryset, True
+
     def order_start(self, queryset, is_descending):
         queryset = queryset.order_by(("-" if is_descending else "") + "start_date_sort")
         return queryset, True
@@ -281,8 +361,8 @@ class InstanceTable(TibscholEntityMixinTable):
 
     author = AuthorColumn(verbose_name="Author", accessor="id", orderable=True)
 
-    def render_item_description(self, value):
-        return mark_safe(render_tei_refs(parse_comment(value)))
+    def render_item_description(self, record):
+        return get_rendered_html(self).get(record, "item_description")
 
     def render_availability(self, value):
         symbol = "indeterminate_question_box"
@@ -298,6 +378,10 @@ class InstanceTable(TibscholEntityMixinTable):
         queryset = queryset.order_by(("-" if is_descending else "") + "start_date_sort")
         return queryset, True
 
+    def order_author(self, queryset, is_descending):
+        queryset = queryset.order_by(("-" if is_descending else "") + "author_name")
+        return queryset, True
+
     author = AuthorColumn(verbose_name="Author", accessor="work_id", orderable=True)
 
 
@@ -334,28 +418,30 @@ class RelationPredicateColumn(CustomTemplateColumn):
         return super().render(record, **kwargs)
 
 
+class ReferencesColumn(MoreLessColumn):
+    """
+    Excerpts, support notes and Zotero references of a relation, with the
+    references of all relations on the page resolved at once.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(
+            preview=lambda x: "", fulltext=render_relation_references, *args, **kwargs
+        )
+
+    def render(self, record, table, **kwargs):
+        html = get_rendered_html(table)
+        self.fulltext = lambda x: html.get(x, "references")
+        return super().render(record, table=table, **kwargs)
+
+
 class TibScholEntityMixinRelationsTable(GenericTable):
+    def __init__(self, data=None, *args, **kwargs):
+        super().__init__(prefetch_relation_entities(data), *args, **kwargs)
+
     relation = RelationNameColumn()
     predicate = RelationPredicateColumn()
-    references = MoreLessColumn(
-        orderable=False,
-        preview=lambda x: "",
-        fulltext=lambda x: mark_safe(
-            (
-                render_tei_refs(getattr(x, "tei_refs", "") or "")
-                .replace("<br />", ", ")
-                .rstrip(", ")
-                + "<br />"
-                if getattr(x, "tei_refs")
-                else ""
-            )
-            + parse_comment(
-                render_list_field(
-                    f"{getattr(x,'support_notes', '') or ''}\n{getattr(x, 'zotero_refs','')  or ''}",
-                )
-            )
-        ),
-    )
+    references = ReferencesColumn(orderable=False)
 
     class Meta(GenericTable.Meta):
         exclude = ["desc"]
@@ -369,48 +455,59 @@ class TibScholEntityMixinRelationsTable(GenericTable):
         )
 
 
-class EntityRelationAuthorColumn(CustomTemplateColumn):
+class EntityRelationAuthorColumn(PageLookupMixin, CustomTemplateColumn):
     template_name = "apis_ontology/linked_entity_column.html"
     verbose_name = "Author (object)"
     orderable = False
+    lookup_key = "authors"
+    resolve_lookup = staticmethod(get_authors)
 
-    def render(self, record, **kwargs):
-        work_or_instance_id = (
-            record.obj_object_id if record.forward else record.subj_object_id
-        )
-        subj_work = AuthorColumn.get_work_from_id(work_or_instance_id)
-        if not subj_work:
-            return ""
-        if getattr(subj_work, "author_id"):
-            try:
-                author = Person.objects.get(pk=getattr(subj_work, "author_id"))
-                self.extra_context = {
-                    "entity": author,
-                }
-                return super().render(author, **kwargs)
-
-            except Person.DoesNotExist:
-                # Author is deleted or not accessible to the user
-                logger.warning("Unable to find author for %s ", subj_work)
+    def get_lookup_id(self, record):
+        return record.obj_object_id if record.forward else record.subj_object_id
 
-        return ""
+    def render(self, record, table, **kwargs):
+        author = self.lookup(table, record)
+        if not author:
+            return ""
+        self.extra_context = {
+            "entity": author,
+        }
+        return super().render(author, table=table, **kwargs)
 
 
-class RelationInstanceColumn(CustomTemplateColumn):
+class RelationInstanceColumn(PageLookupMixin, CustomTemplateColumn):
     template_name = "apis_ontology/instance_details_column.html"
     verbose_name = "Object details"
     orderable = False
+    lookup_key = "instances"
+    resolve_lookup = staticmethod(Instance.objects.in_bulk)
 
-    def render(self, record, **kwargs):
-        instance_id = record.obj_object_id if record.forward else record.subj_object_id
-        instance = Instance.objects.get(pk=instance_id)
+    def get_lookup_id(self, record):
+        return record.obj_object_id if record.forward else record.subj_object_id
+
+    def render(self, record, table, **kwargs):
+        instance = self.lookup(table, record)
+        if not instance:
+            return ""
+        if not hasattr(table, "_instance_references"):
+            # the instances of the page are resolved by now, so are their
+            # references; others (e.g. during exports) resolve as they render
+            table._instance_references = comment_references(
+                *filter(None, table._page_lookups[self.lookup_key].values())
+            )
         self.extra_context = {
             "instance": instance,
+            "references": table._instance_references,
             "lost": instance.availability == "lost",
             "non_accessible": instance.availability == "non-accessible",
             "available": instance.availability == "available",
         }
-        return super().render(instance, **kwargs)
+        return super().render(instance, table=table, **kwargs)
+
+
+class RelationPersonDateColumn(PersonDateColumn):
+    def get_lookup_id(self, record):
+        return record.obj_object_id if record.forward else record.subj_object_id
 
 
 class TibScholEntityMixinWorkRelationsTable(TibScholEntityMixinRelationsTable):
@@ -445,24 +542,10 @@ class WorkInstanceRelationsTable(InstanceTabRelationsTable):
 
 
 class TibScholEntityMixinPersonRelationsTable(TibScholEntityMixinRelationsTable):
-    lifespan_obj = tables.Column(
+    lifespan_obj = RelationPersonDateColumn(
         orderable=False, verbose_name="Lifespan (obj)", accessor="subj_object_id"
     )
 
-    def render_lifespan_obj(self, record):
-        person_id = record.obj_object_id if record.forward else record.subj_object_id
-        try:
-            person = Person.objects.get(pk=person_id)
-        except Person.DoesNotExist:
-            return ""
-        return (
-            (person.start if person.start else "")
-            + " - "
-            + (person.end if person.end else "")
-        )
-
-        return ""
-
     class Meta(TibScholEntityMixinRelationsTable.Meta):
         pass
 
@@ -515,20 +598,20 @@ class TibScholRelationMixinTable(GenericTable):
     def value_obj(self, value):
         return getattr(value, "name", "") or getattr(value, "label", "") or ""
 
-    def render_zotero_refs(self, value):
-        return mark_safe(parse_comment(render_list_field(value)))
+    def render_zotero_refs(self, record):
+        return get_rendered_html(self).get(record, "zotero_refs")
 
     def value_zotero_refs(self, value):
         return value
 
-    def render_support_notes(self, value):
-        return mark_safe(parse_comment(render_list_field(value)))
+    def render_support_notes(self, record):
+        return get_rendered_html(self).get(record, "support_notes")
 
     def value_support_notes(self, value):
         return value
 
-    def render_tei_refs(self, value):
-        return mark_safe(render_tei_refs(value))
+    def render_tei_refs(self, record):
+        return get_rendered_html(self).get(record, "tei_refs")
 
     def value_tei_refs(self, value):
         return value
@@ -1,5 +1,5 @@
 import logging
-from apis_ontology.models import ZoteroEntry
+from apis_ontology.caches import zotero_cache
 from django import template
 from django.utils.safestring import mark_safe
 
@@ -59,11 +59,11 @@ def render_zotero_links(value):
     for zotero_id in zotero_refs:
         link_text = zotero_id  # fallback default value
         try:
-            zotero_obj = ZoteroEntry.objects.filter(zoteroId=zotero_id)[0]
-            link_text = zotero_obj.shortTitle if zotero_obj.shortTitle else zotero_id
-
-        except IndexError:
-            logger.error(f"Error finding cached Zotero entry with ID %s", zotero_id)
+            entry = zotero_cache.get(zotero_id)
+            if entry is None:
+                logger.error(f"Error finding cached Zotero entry with ID %s", zotero_id)
+            elif entry[0]:
+                link_text = entry[0]
         except Exception as e:
             logger.error(
                 f"Error while fetching zotero data %s\n for %s", repr(e), zotero_id
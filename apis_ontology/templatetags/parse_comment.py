@@ -3,7 +3,7 @@ import re
 
 
 from apis_core.apis_metainfo.models import RootObject
-from apis_ontology.models import ZoteroEntry
+from apis_ontology.caches import zotero_cache
 from django import template
 from django.contrib.contenttypes.models import ContentType
 
@@ -12,55 +12,109 @@ from apis_ontology.templatetags.filter_utils import render_list_field
 register = template.Library()
 logger = logging.getLogger(__name__)
 
+ZOTERO_URL = "https://www.zotero.org/groups/4394244/tibschol/items/{}/item-details#"
+
+# Define the regex pattern to capture different groups
+COMMENT_PATTERN = re.compile(
+    r"<<(?P<text>.*?) \[(?P<zotero_id>[A-Z0-9]+)\]>>|\[(?P<zotero_id_only>[A-Z0-9]+)\]|\(ID:\s*(?P<entity_id>\d+)\)"
+)
+
+
+class CommentReferences:
+    """
+    The entities and Zotero entries referenced by `(ID: n)` and `[KEY]`
+    markers in comments. `resolve` scans any number of texts first and
+    then looks up all ids not seen before with one query per kind, so
+    that a whole table page can be resolved at once.
+    """
+
+    def __init__(self):
+        # entity id -> content type name (None if not found)
+        self.entities = {}
+        # zotero id -> short title (None if not found)
+        self.zotero = {}
+
+    def resolve(self, values):
+        entity_ids = set()
+        zotero_ids = set()
+        for value in values:
+            if not value:
+                continue
+            for match in COMMENT_PATTERN.finditer(value):
+                if match.group("zotero_id_only"):
+                    zotero_ids.add(match.group("zotero_id_only"))
+                elif match.group("entity_id"):
+                    entity_ids.add(int(match.group("entity_id")))
+
+        entity_ids -= self.entities.keys()
+        if entity_ids:
+            self.entities.update(dict.fromkeys(entity_ids))
+            for root_obj in RootObject.objects_inheritance.filter(
+                pk__in=entity_ids
+            ).select_subclasses():
+                ct = ContentType.objects.get_for_model(root_obj)
+                self.entities[root_obj.pk] = ct.name
+
+        zotero_ids -= self.zotero.keys()
+        if zotero_ids:
+            for zotero_id, entry in zotero_cache.get_many(zotero_ids).items():
+                self.zotero[zotero_id] = entry and (entry[0] or zotero_id)
+        return self
+
+
+# fields whose references templates resolve up front with comment_references
+COMMENT_FIELDS = ("comments", "item_description")
+
+
+@register.simple_tag
+def comment_references(*objects):
+    """
+    Resolve the references in the comment fields of all the objects at
+    once, to be passed to every parse_comment of the template.
+    """
+    return CommentReferences().resolve(
+        getattr(obj, field, None) for obj in objects for field in COMMENT_FIELDS
+    )
+
 
 @register.filter
-def parse_comment(value):
+def parse_comment(value, references=None):
     if not value:
         return ""
 
+    references = (references or CommentReferences()).resolve([value])
+
     def custom_replace(match):
         if match.group("text"):
             # Handle <<text [ZoteroID]>>
             text = match.group("text")
             zotero_id = match.group("zotero_id")
-            replacement = f'<a target="_BLANK" href="https://www.zotero.org/groups/4394244/tibschol/items/{zotero_id}/item-details#">{text}</a>'
+            replacement = f'<a target="_BLANK" href="{ZOTERO_URL.format(zotero_id)}">{text}</a>'
         elif match.group("zotero_id_only"):
             # Handle [ZoteroID]
             zotero_id = match.group("zotero_id_only")
-            try:
-                zotero_obj = ZoteroEntry.objects.filter(zoteroId=zotero_id)[0]
-                link_text = (
-                    zotero_obj.shortTitle if zotero_obj.shortTitle else zotero_id
-                )
-                return f'<a target="_BLANK" href="https://www.zotero.org/groups/4394244/tibschol/items/{zotero_id}/item-details#">{link_text}</a>'
-            except Exception as e:
-                logger.error(f"Error finding cached Zotero entry with ID %s", zotero_id)
-                logger.error(repr(e))
-                return f'<a target="_BLANK" href="https://www.zotero.org/groups/4394244/tibschol/items/{zotero_id}/item-details#">{zotero_id}</a>'
+            link_text = references.zotero.get(zotero_id)
+            if link_text is None:
+                logger.error("Error finding cached Zotero entry with ID %s", zotero_id)
+                link_text = zotero_id
+            return f'<a target="_BLANK" href="{ZOTERO_URL.format(zotero_id)}">{link_text}</a>'
         elif match.group("entity_id"):
             # Handle (ID: number)
             entity_id = match.group("entity_id")
-            try:
-                root_obj = RootObject.objects_inheritance.get_subclass(pk=entity_id)
-                ct = ContentType.objects.get_for_model(root_obj)
-                return f'<a target="_BLANK" href="/apis/apis_ontology.{ct.name}/{root_obj.pk}">({entity_id})</a>'
-
-            except Exception as e:
+            ct_name = references.entities.get(int(entity_id))
+            if ct_name is None:
                 logger.error("Error finding entity #%s", entity_id)
-                logger.error(repr(e))
                 return (
                     f'<a target="_BLANK" href="/entity/{entity_id}">({entity_id})</a>'
                 )
+            return f'<a target="_BLANK" href="/apis/apis_ontology.{ct_name}/{int(entity_id)}">({entity_id})</a>'
         else:
             # If no specific group is matched, return the original match
             replacement = match.group(0)
 
         return replacement
 
-    # Define the regex pattern to capture different groups
-    combined_pattern = r"<<(?P<text>.*?) \[(?P<zotero_id>[A-Z0-9]+)\]>>|\[(?P<zotero_id_only>[A-Z0-9]+)\]|\(ID:\s*(?P<entity_id>\d+)\)"
-
     # Apply substitutions using the combined pattern and custom replacement function
-    transformed_value = re.sub(combined_pattern, custom_replace, value)
+    transformed_value = COMMENT_PATTERN.sub(custom_replace, value)
 
     return render_list_field(transformed_value)
@@ -0,0 +1,80 @@
+import functools
+import threading
+
+from django.conf import settings
+from pyewts import pyewts
+
+TRANSLITERATION_CACHE_SIZE = getattr(settings, "TRANSLITERATION_CACHE_SIZE", 10000)
+
+
+class Transliterator:
+    """
+    EWTS transliteration between Latin and Unicode Tibetan.
+
+    Builds the pyewts converter once and keeps the most recent
+    conversions in a bounded LRU cache. Use the process wide
+    `transliterator` instance rather than creating new ones.
+    """
+
+    def __init__(self, maxsize=TRANSLITERATION_CACHE_SIZE):
+        self._converter = None
+        self._lock = threading.Lock()
+        self._to_tibetan = functools.lru_cache(maxsize=maxsize)(self._convert_to_tibetan)
+        self._to_latin = functools.lru_cache(maxsize=maxsize)(self._convert_to_latin)
+
+    @property
+    def converter(self):
+        if self._converter is None:
+            with self._lock:
+                if self._converter is None:
+                    self._converter = pyewts()
+        return self._converter
+
+    def _convert_to_tibetan(self, value):
+        return self.converter.toUnicode(value)
+
+    def _convert_to_latin(self, value):
+        return self.converter.toWylie(value)
+
+    def to_tibetan(self, value):
+        """Convert EWTS (Latin) transliteration to Unicode Tibetan"""
+        if not value:
+            return ""
+        return self._to_tibetan(value)
+
+    def to_latin(self, value):
+        """Convert Unicode Tibetan to EWTS (Latin) transliteration"""
+        if not value:
+            return ""
+        return self._to_latin(value)
+
+    def to_tibetan_many(self, values):
+        """Convert a list of strings, each distinct value only once"""
+        converted = {value: self.to_tibetan(value) for value in set(values)}
+        return [converted[value] for value in values]
+
+    def to_latin_many(self, values):
+        """Convert a list of strings, each distinct value only once"""
+        converted = {value: self.to_latin(value) for value in set(values)}
+        return [converted[value] for value in values]
+
+    def cache_info(self):
+        return {
+            "to_tibetan": self._to_tibetan.cache_info(),
+            "to_latin": self._to_latin.cache_info(),
+        }
+
+    def cache_clear(self):
+        self._to_tibetan.cache_clear()
+        self._to_latin.cache_clear()
+
+
+transliterator = Transliterator()
+
+
+def to_tibetan_many(values):
+    """
+    Module level entry point to `Transliterator.to_tibetan_many`, so that
+    it can be handed to worker processes.
+    """
+    return transliterator.to_tibetan_many(values)
@@ -1,7 +1,9 @@
 from apis_ontology.views import (
     DataModelView,
+    ExcerptsBatchView,
     ExcerptsView,
-    ExportRelationsJSONView,
+    ExportRelationsView,
+    SearchView,
     update_script_preference,
 )
 from django.contrib import admin
@@ -20,6 +22,11 @@ urlpatterns = [
     path("accounts/", include("django.contrib.auth.urls")),
     path("entity/<int:pk>/", GetEntityGeneric.as_view(), name="GetEntityGenericRoot"),
     path("", TemplateView.as_view(template_name="base.html")),
+    path(
+        "apis/excerpts/",
+        ExcerptsBatchView.as_view(),
+        name="excerpts_batch_view",
+    ),
     path(
         "apis/excerpts/<str:xml_id>/<str:render_style>/",
         ExcerptsView.as_view(),
@@ -37,9 +44,19 @@ urlpatterns = [
     ),
     path(
         "apis/export-relations-json/",
-        ExportRelationsJSONView.as_view(),
+        ExportRelationsView.as_view(),
         name="relations.json",
     ),
+    path(
+        "apis/export-relations/",
+        ExportRelationsView.as_view(),
+        name="relations.export",
+    ),
+    path(
+        "apis/search/",
+        SearchView.as_view(),
+        name="search",
+    ),
     path(
         "update-script-preference/",
         update_script_preference,
@@ -1,6 +1,11 @@
-from django.contrib.contenttypes.models import ContentType
-from django.db import models
-from pyewts import pyewts
+import functools
+import re
+import unicodedata
+
+from django.apps import apps
+from django.utils.text import format_lazy
+
+from apis_ontology.transliteration import transliterator
 
 
 def is_relavent_relation_model(relation_model, entity_model):
@@ -11,26 +16,29 @@ def is_relavent_relation_model(relation_model, entity_model):
         )
 
 
+@functools.cache
 def get_relevant_relations(any_model):
+    """
+    Choices of the relation classes `any_model` takes part in, taken from
+    the model registry (no database queries) and computed once per model.
+    """
     relavent_rels = []
-    for ct in ContentType.objects.filter(models.Q(app_label="apis_ontology")):
-        rel_model = ct.model_class()
+    for rel_model in apps.get_app_config("apis_ontology").get_models():
         if hasattr(rel_model, "subj_model") and hasattr(rel_model, "obj_model"):
             if rel_model.subj_model == any_model and rel_model.obj_model == any_model:
                 relavent_rels.append(
                     (
                         f"{rel_model.__name__}",
-                        f"{rel_model.name}/{rel_model.reverse_name}",
+                        format_lazy("{}/{}", rel_model.name(), rel_model.reverse_name()),
                     )
                 )
 
             elif rel_model.subj_model == any_model:
-                relavent_rels.append((f"{rel_model.__name__}", rel_model.name))
+                relavent_rels.append((f"{rel_model.__name__}", rel_model.name()))
             elif rel_model.obj_model == any_model:
-                relavent_rels.append((f"{rel_model.__name__}", rel_model.reverse_name))
-
-    return relavent_rels
+                relavent_rels.append((f"{rel_model.__name__}", rel_model.reverse_name()))
 
+    return sorted(relavent_rels, key=lambda choice: str(choice[1]))
 
 
 def latin_to_tibetan(value):
@@ -38,10 +46,7 @@ def latin_to_tibetan(value):
 	Converts EWTS (Latin) transliteration to Unicode Tibetan.
 	Usage: {{ value|latin_to_tibetan }}
 	"""
-	if not value:
-		return ''
-	converter = pyewts()
-	return converter.toUnicode(value)
+	return transliterator.to_tibetan(value)
 
 
 def tibetan_to_latin(value):
@@ -49,7 +54,23 @@ def tibetan_to_latin(value):
 	Converts Unicode Tibetan to EWTS (Latin) transliteration.
 	Usage: {{ value|tibetan_to_latin }}
 	"""
+	return transliterator.to_latin(value)
+
+
+TIBETAN_SCRIPT = re.compile(r"[\u0f00-\u0fff]+")
+APOSTROPHES = re.compile(r"['\u2018\u2019\u02bc`]")
+
+
+def tibetan_name_key(value):
+	"""
+	Script-agnostic matching key of a name: Unicode Tibetan is converted
+	to EWTS, then case, accents and apostrophes are dropped and any other
+	punctuation separates words, so that "Ne'u thog", "neu thog" and
+	"ནེའུ་ཐོག" all become "neu thog".
+	"""
 	if not value:
-		return ''
-	converter = pyewts()
-	return converter.toWylie(value)
+		return ""
+	value = TIBETAN_SCRIPT.sub(lambda m: f" {tibetan_to_latin(m.group())} ", value)
+	value = unicodedata.normalize("NFKD", APOSTROPHES.sub("", value.lower()))
+	value = "".join(c for c in value if not unicodedata.combining(c))
+	return " ".join(re.findall(r"[^\W_]+", value))
@@ -1,50 +1,158 @@
 import logging
-import re
+import tempfile
 
-from django.http import JsonResponse
+from django.core.cache import cache
+from django.http import (
+    FileResponse,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
 from django.views import View
 from django.views.generic.base import TemplateView
 
+from .caches import EXCERPTS_CACHE_TIMEOUT, excerpt_cache_key, excerpts_generation
 from .data_model_utils import DataModel
-from .export_utils import TibScholDataExport
+from .export_utils import TibScholDataExport, TibScholDeltaExport
 from .forms import UserScriptPreferenceForm
-from .models import Excerpts, Instance, UserScriptPreference
+from .models import (
+    Excerpts,
+    Instance,
+    InstanceReference,
+    SearchDocument,
+    UserScriptPreference,
+)
 
 
-class ExcerptsView(View):
-    def get(self, request, xml_id, render_style, *args, **kwargs):
-        def get_instances_from_tibschol_refs(tibschol_refs):
-            tibschol_refs = tibschol_refs.strip()
-            instances = []
-            for tibschol_ref in tibschol_refs.split("\n"):
-                try:
-                    instance = Instance.objects.get(
-                        tibschol_ref__iregex=rf"(?m)(^|\W){re.escape(tibschol_ref)}(\W|$)"
-                    )
-                    instances.append(
-                        f"<a href='{instance.get_absolute_url()}' target=_BLANK> {str(instance)} </a>"
-                    )
-                except Instance.DoesNotExist:
-                    logging.warning(
-                        "No Instance found for TIBSchol ref: %s", tibschol_ref
-                    )
-                    pass
-
-            return list(set(instances))
-
-        record = get_object_or_404(Excerpts, xml_id=xml_id)
-        instances = get_instances_from_tibschol_refs(record.tibschol_refs)
-        data = {
+def split_tibschol_refs(tibschol_refs):
+    return [ref for ref in (tibschol_refs or "").strip().split("\n") if ref.strip()]
+
+
+def build_excerpt_payloads(records):
+    """
+    Build the popup payloads of the given excerpts, resolving the TibSchol
+    references of all of them with one index lookup and one instance query.
+    """
+    records = list(records)
+    matches = InstanceReference.objects.lookup(
+        {ref for record in records for ref in split_tibschol_refs(record.tibschol_refs)}
+    )
+    instances = Instance.objects.in_bulk(set().union(*matches.values()))
+    payloads = {}
+    for record in records:
+        instance_ids = set()
+        for tibschol_ref in split_tibschol_refs(record.tibschol_refs):
+            instance_ids.update(matches[tibschol_ref])
+            if not matches[tibschol_ref]:
+                logging.warning(
+                    "No Instance found for TIBSchol ref: %s", tibschol_ref
+                )
+        links = [
+            f"<a href='{instances[pk].get_absolute_url()}' target=_BLANK> {str(instances[pk])} </a>"
+            for pk in sorted(instance_ids)
+            if pk in instances
+        ]
+        payloads[record.xml_id] = {
             "xml_content": record.xml_content,
             "xml_id": record.xml_id,
             "status": f"[{record.status}]" if record.status else "[unknown]",
             "location": record.location,
             "tibschol_refs": record.tibschol_refs,
-            "instances": ", ".join(instances),
+            "instances": ", ".join(links),
         }
+    return payloads
+
+
+def get_excerpt_payloads(xml_ids):
+    """
+    Return the popup payloads of the given excerpts, from the cache where
+    it holds an entry for their current content and built in bulk otherwise.
+    """
+    generation = excerpts_generation()
+    hashes = dict(
+        Excerpts.objects.filter(xml_id__in=xml_ids).values_list(
+            "xml_id", "content_hash"
+        )
+    )
+    keys = {xml_id: excerpt_cache_key(xml_id, generation) for xml_id in hashes}
+    cached = cache.get_many(keys.values())
+    payloads = {}
+    for xml_id, key in keys.items():
+        if key in cached and cached[key][0] == hashes[xml_id]:
+            payloads[xml_id] = cached[key][1]
+
+    missing = [xml_id for xml_id in hashes if xml_id not in payloads]
+    if missing:
+        records = list(Excerpts.objects.filter(xml_id__in=missing))
+        built = build_excerpt_payloads(records)
+        cache.set_many(
+            {
+                keys[record.xml_id]: (record.content_hash, built[record.xml_id])
+                for record in records
+            },
+            EXCERPTS_CACHE_TIMEOUT,
+        )
+        payloads.update(built)
+    return payloads
+
 
-        return JsonResponse(data)  # Return the data as JSON response
+class ExcerptsView(View):
+    """
+    Excerpt popup data. Responses carry an ETag built from the content
+    hash of the excerpt, so that browsers revalidate with a cheap query,
+    and the payload is cached until the excerpt or any instance changes.
+    """
+
+    def get(self, request, xml_id, render_style, *args, **kwargs):
+        generation = excerpts_generation()
+        content_hash = get_object_or_404(
+            Excerpts.objects.values_list("content_hash", flat=True), xml_id=xml_id
+        )
+        # no Last-Modified: the payload also changes with the instances,
+        # which the ETag covers through the generation
+        etag = f'"{content_hash[:32]}-{generation}"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            data = get_excerpt_payloads([xml_id])[xml_id]
+            response = JsonResponse(data)  # Return the data as JSON response
+
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class ExcerptsBatchView(View):
+    """
+    Popup data of many excerpts at once, e.g. all excerpts referenced on
+    a relation page. Takes `xml_id` (repeatable or comma separated) and
+    returns the payloads by id plus the ids that were not found.
+    """
+
+    max_ids = 200
+
+    def get(self, request, *args, **kwargs):
+        xml_ids = list(
+            dict.fromkeys(
+                xml_id.strip()
+                for values in request.GET.getlist("xml_id")
+                for xml_id in values.split(",")
+                if xml_id.strip()
+            )
+        )
+        if len(xml_ids) > self.max_ids:
+            return HttpResponseBadRequest(
+                f"At most {self.max_ids} excerpts can be requested at once"
+            )
+        payloads = get_excerpt_payloads(xml_ids)
+        return JsonResponse(
+            {
+                "excerpts": payloads,
+                "missing": [xml_id for xml_id in xml_ids if xml_id not in payloads],
+            }
+        )
 
 
 class DataModelView(TemplateView):
@@ -56,10 +164,127 @@ class DataModelView(TemplateView):
         return ctx
 
 
-class ExportRelationsJSONView(View):
+class ExportRelationsView(View):
+    """
+    Export relations as JSON, NDJSON, CSV or Parquet.
+
+    Query parameters: `format`, `relation_class`, `confidence`,
+    `entity_type` (repeatable or comma separated), `date_from` and
+    `date_to` (YYYY-MM-DD). With `since` (a timestamp or the token from
+    the `X-Export-Token` header of a previous export) only the changes
+    since then are exported.
+    """
+
+    default_format = "json"
+
+    @staticmethod
+    def get_list(request, key):
+        return [
+            value
+            for values in request.GET.getlist(key)
+            for value in values.split(",")
+            if value.strip()
+        ]
+
+    @staticmethod
+    def get_date(request, key):
+        value = request.GET.get(key)
+        if not value:
+            return None
+        date = parse_date(value)
+        if date is None:
+            raise ValueError(f"Invalid {key}: {value}")
+        return date
+
     def get(self, request, *args, **kwargs):
-        data = TibScholDataExport.all_relations()
-        return JsonResponse(data, safe=False)
+        format = request.GET.get("format", self.default_format).lower()
+        since = request.GET.get("since")
+        export_class = TibScholDeltaExport if since else TibScholDataExport
+        try:
+            if format not in export_class.formats:
+                raise ValueError(f"Unknown export format: {format}")
+            filters = dict(
+                relation_classes=self.get_list(request, "relation_class"),
+                confidence=self.get_list(request, "confidence"),
+                entity_types=self.get_list(request, "entity_type"),
+                date_from=self.get_date(request, "date_from"),
+                date_to=self.get_date(request, "date_to"),
+            )
+            if since:
+                export = TibScholDeltaExport(since, **filters)
+            else:
+                export = TibScholDataExport(**filters)
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+
+        content_type = export_class.formats[format]
+        filename = f"relations.{format}"
+        if format == "parquet":
+            fileobj = tempfile.TemporaryFile()
+            export.write_parquet(fileobj)
+            fileobj.seek(0)
+            return FileResponse(
+                fileobj,
+                as_attachment=True,
+                filename=filename,
+                content_type=content_type,
+            )
+
+        response = StreamingHttpResponse(
+            export.stream(format), content_type=content_type
+        )
+        if format != "json":
+            response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        if since:
+            response["X-Export-Token"] = export.token
+        return response
+
+
+class SearchView(View):
+    """
+    Full text search over the names, alternative labels, Tibetan script
+    and comments of all entities, ordered by relevance.
+
+    Query parameters: `q`, `entity_type` (repeatable or comma separated),
+    `limit` and `format` (`html`, rendering the result cards, or `json`).
+    """
+
+    default_limit = 50
+    max_limit = 200
+
+    def get(self, request, *args, **kwargs):
+        entity_types = ExportRelationsView.get_list(request, "entity_type")
+        try:
+            limit = int(request.GET.get("limit", self.default_limit))
+        except ValueError:
+            return HttpResponseBadRequest("Invalid limit")
+        if not 0 < limit <= self.max_limit:
+            return HttpResponseBadRequest(
+                f"limit must be between 1 and {self.max_limit}"
+            )
+
+        try:
+            results = SearchDocument.objects.search(
+                request.GET.get("q", ""), entity_types
+            )[:limit]
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        if request.GET.get("format") == "json":
+            return JsonResponse(
+                {
+                    "results": [
+                        {
+                            "entity_type": result.entity_type,
+                            "source_object_id": result.source_object_id,
+                            "label": result.label,
+                            "search_text": result.search_text,
+                            "rank": result.rank,
+                        }
+                        for result in results
+                    ]
+                }
+            )
+        return render(request, "partials/search_results.html", {"results": results})
 
 
 def update_script_preference(request):